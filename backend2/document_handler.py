@@ -6,35 +6,62 @@ Handles loading, modifying, and saving Word documents using python-docx
 import os
 import sys
 import re
+import shutil
+import zipfile
+from functools import lru_cache
+from bisect import bisect_right
+from copy import deepcopy
+from lxml import etree
 from docx import Document
+from docx.opc.oxml import serialize_part_xml
 from typing import Dict, List, Tuple, Optional
 
+# Text following a label: an existing value (up to the next whitespace) or a blank run
+_EXISTING_VALUE_RE = re.compile(r'[^\s\n]+')
+_BLANK_RE = re.compile(r'[\s\n\t]+')
+
+
 
 class DocumentHandler:
     def __init__(self, doc_path: str):
         """Initialize document handler with path to .docx file"""
         self.doc_path = doc_path
         self.doc = None
-        self.full_text = ""
+        self._full_text = None  # Extracted lazily on first access, cleared when a paragraph changes
+        # Paragraph run text keyed by the paragraph's XML element; python-docx creates
+        # new Paragraph proxies on every access, but the underlying element is stable
+        self._para_text_cache = {}
+        self._modified = False  # Set once any paragraph is rewritten after loading
+        # (start offsets, paragraphs) of every paragraph in the document text as loaded
+        self._para_offsets = None
+        # (name, compress_type, data) for every package part after the first save; the main
+        # document part is stored as None and re-serialized on each save_document_fast()
+        self._cached_parts = None
         
     def load_document(self) -> bool:
         """Load the .docx document"""
         try:
             self.doc = Document(self.doc_path)
-            self._extract_text_structure()
+            self._para_text_cache = {}
+            self._full_text = None
+            self._cached_parts = None
+            self._modified = False
+            # Map offsets of the loaded text to paragraphs before any replacement rewrites them
+            self._build_paragraph_offsets()
             return True
         except Exception as e:
             print(f"Error loading document: {e}", file=sys.stderr)
             return False
     
-    def _extract_text_structure(self):
-        """Extract text while preserving structure"""
-        self.full_text = ""
-        
+    def is_loaded(self) -> bool:
+        """Return True if the document is loaded and has not been modified since loading"""
+        return self.doc is not None and not self._modified
+    
+    def iter_text(self):
+        """Yield the document text line by line (body paragraphs, then non-empty table cells)"""
         # Extract from regular paragraphs
         for para in self.doc.paragraphs:
-            para_text = para.text
-            self.full_text += para_text + "\n"
+            yield para.text + "\n"
         
         # Extract from table cells
         for table in self.doc.tables:
@@ -42,13 +69,72 @@ class DocumentHandler:
                 for cell in row.cells:
                     cell_text = cell.text
                     if cell_text.strip():
-                        self.full_text += cell_text + "\n"
+                        yield cell_text + "\n"
+    
+    def _extract_text_structure(self):
+        """Extract text while preserving structure"""
+        # Single join over all lines keeps construction linear in document size
+        self._full_text = ''.join(self.iter_text())
+    
+    def _build_paragraph_offsets(self):
+        """Record where each paragraph starts in the document text (same layout as iter_text)"""
+        starts = []
+        paragraphs = []
+        pos = 0
+        for para in self.doc.paragraphs:
+            starts.append(pos)
+            paragraphs.append(para)
+            pos += len(self._get_para_text(para)) + 1
+        
+        # A table cell is one line of its paragraphs joined with newlines, skipped when blank
+        for table in self.doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    cell_paragraphs = cell.paragraphs
+                    texts = [self._get_para_text(para) for para in cell_paragraphs]
+                    if not '\n'.join(texts).strip():
+                        continue
+                    for para, text in zip(cell_paragraphs, texts):
+                        starts.append(pos)
+                        paragraphs.append(para)
+                        pos += len(text) + 1
+        
+        self._para_offsets = (starts, paragraphs)
+    
+    @property
+    def full_text(self) -> str:
+        """Full document text, extracted when first needed and reused until the document is modified"""
+        if self._full_text is None:
+            self._extract_text_structure()
+        return self._full_text
     
     def get_full_text(self) -> str:
         """Return extracted full text"""
         return self.full_text
     
-    def _replace_text_preserving_format(self, para, new_text: str, label_start_pos: Optional[int] = None):
+    def _iter_all_paragraphs(self):
+        """
+        Yield body paragraphs followed by the paragraphs of every table cell.
+        
+        A merged cell is repeated in row.cells for every grid cell it spans, so its paragraphs are
+        yielded once per spanned cell, as its text is in iter_text().
+        """
+        yield from self.doc.paragraphs
+        for table in self.doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    yield from cell.paragraphs
+    
+    def _get_para_text(self, para) -> str:
+        """Return the joined run text of a paragraph, cached until the paragraph is modified"""
+        text = self._para_text_cache.get(para._p)
+        if text is None:
+            text = ''.join([run.text for run in para.runs])
+            self._para_text_cache[para._p] = text
+        return text
+    
+    def _replace_text_preserving_format(self, para, new_text: str, label_start_pos: Optional[int] = None,
+                                        source_spans: Optional[List[Tuple[int, int, bool]]] = None):
         """
         Replace text in paragraph while preserving formatting character-by-character.
         Maps each character in new_text to corresponding character in old text to preserve formatting.
@@ -57,18 +143,35 @@ class DocumentHandler:
             para: The paragraph to modify
             new_text: The new text to replace with
             label_start_pos: Optional position where label starts (for label fields, preserve label formatting)
+            source_spans: Optional consecutive (length, old_pos, copy) spans covering new_text. A copied span maps
+                          one-to-one onto old text starting at old_pos; otherwise every character takes the
+                          formatting at old_pos. When omitted, spans are derived from the common prefix/suffix
+                          of old and new text.
         """
-        # Build character-to-run mapping to preserve formatting BEFORE clearing runs
-        char_to_run = []
+        # Record where each non-empty run starts in the old text, and its formatting,
+        # BEFORE clearing runs. A run's formatting is its whole rPr element; the serialized
+        # rPr is the key used to tell whether two runs are formatted identically
+        run_starts = []
+        run_rprs = []
+        run_format_keys = []
+        old_text_parts = []
         char_pos = 0
-        runs_list = list(para.runs)  # Copy list before clearing
-        old_text = ''.join([run.text for run in runs_list])
-        
-        for run in runs_list:
+        for run in para.runs:
             run_text = run.text
-            for i in range(len(run_text)):
-                char_to_run.append((char_pos + i, run))
+            if not run_text:
+                continue
+            run_starts.append(char_pos)
+            rPr = run._r.rPr
+            run_rprs.append(rPr)
+            run_format_keys.append(etree.tostring(rPr) if rPr is not None else b'')
+            old_text_parts.append(run_text)
             char_pos += len(run_text)
+        old_text = ''.join(old_text_parts)
+        
+        # Runs are about to change - drop the cached paragraph and document text
+        self._para_text_cache.pop(para._p, None)
+        self._full_text = None
+        self._modified = True
         
         # Clear all runs
         for run in para.runs:
@@ -78,122 +181,187 @@ class DocumentHandler:
         # Map new text characters to old text positions to preserve formatting
         # We need to find where the replacement happened and map accordingly
         
-        if not char_to_run:
+        if not old_text:
             # No old text, just add plain text
             para.add_run(new_text)
             return
         
-        # Find the difference between old and new text to locate replacement
-        # Simple approach: find longest common prefix and suffix
-        prefix_len = 0
-        suffix_len = 0
-        
-        # Find common prefix
-        for i in range(min(len(old_text), len(new_text))):
-            if old_text[i] == new_text[i]:
-                prefix_len += 1
-            else:
-                break
-        
-        # Find common suffix
-        old_rev = old_text[::-1]
-        new_rev = new_text[::-1]
-        for i in range(min(len(old_text) - prefix_len, len(new_text) - prefix_len)):
-            if old_rev[i] == new_rev[i]:
-                suffix_len += 1
-            else:
-                break
-        
-        # Build runs for new text, preserving formatting from corresponding positions in old text
-        current_run = None
-        current_run_format = None
-        
-        for i, char in enumerate(new_text):
-            # Determine which run format to use for this character
-            target_run = None
-            old_pos = None
+        if source_spans is None:
+            # Find the difference between old and new text to locate replacement
+            # Simple approach: find longest common prefix and suffix
+            prefix_len = 0
+            suffix_len = 0
             
-            if i < prefix_len:
-                # Before replacement - use original position
-                old_pos = i
-                target_run = char_to_run[i][1]
-            elif i >= len(new_text) - suffix_len:
-                # After replacement - map to corresponding position in old text
-                # Calculate offset: new_suffix_start - old_suffix_start
-                new_suffix_start = len(new_text) - suffix_len
-                old_suffix_start = len(old_text) - suffix_len
-                old_pos = old_suffix_start + (i - new_suffix_start)
-                if old_pos < len(char_to_run):
-                    target_run = char_to_run[old_pos][1]
-            else:
-                # In replacement region - use formatting from before replacement (or after if at start)
-                if prefix_len > 0 and prefix_len < len(char_to_run):
-                    # Use formatting from character just before replacement
-                    target_run = char_to_run[prefix_len - 1][1]
-                elif suffix_len > 0 and (len(old_text) - suffix_len) < len(char_to_run):
-                    # Use formatting from character just after replacement
-                    target_run = char_to_run[len(old_text) - suffix_len][1]
-                elif label_start_pos is not None and label_start_pos < len(char_to_run):
-                    # For label fields, use label's formatting
-                    target_run = char_to_run[label_start_pos][1]
-                elif len(char_to_run) > 0:
-                    # Fallback: use formatting from last character
-                    target_run = char_to_run[-1][1]
+            # Find common prefix
+            for i in range(min(len(old_text), len(new_text))):
+                if old_text[i] == new_text[i]:
+                    prefix_len += 1
+                else:
+                    break
             
-            # Check if we need to start a new run (formatting changed)
-            if target_run:
-                # Get formatting properties for this character
-                char_format = {
-                    'bold': target_run.bold,
-                    'italic': target_run.italic,
-                    'underline': target_run.underline,
-                    'font_name': target_run.font.name if target_run.font.name else None,
-                    'font_size': target_run.font.size if target_run.font.size else None,
-                    'font_color': target_run.font.color.rgb if target_run.font.color.rgb else None,
-                }
-                
-                # Compare formatting (handle None values properly)
-                formatting_changed = True
-                if current_run_format is not None:
-                    formatting_changed = (
-                        char_format['bold'] != current_run_format['bold'] or
-                        char_format['italic'] != current_run_format['italic'] or
-                        char_format['underline'] != current_run_format['underline'] or
-                        char_format['font_name'] != current_run_format['font_name'] or
-                        char_format['font_size'] != current_run_format['font_size'] or
-                        char_format['font_color'] != current_run_format['font_color']
-                    )
-                
-                # Start new run if formatting changed
-                if formatting_changed:
-                    current_run = para.add_run(char)
-                    current_run_format = char_format
-                    
-                    # Apply formatting
-                    if char_format['bold'] is not None:
-                        current_run.bold = char_format['bold']
-                    if char_format['italic'] is not None:
-                        current_run.italic = char_format['italic']
-                    if char_format['underline'] is not None:
-                        current_run.underline = char_format['underline']
-                    if char_format['font_name']:
-                        current_run.font.name = char_format['font_name']
-                    if char_format['font_size']:
-                        current_run.font.size = char_format['font_size']
-                    if char_format['font_color']:
-                        current_run.font.color.rgb = char_format['font_color']
+            # Find common suffix
+            old_rev = old_text[::-1]
+            new_rev = new_text[::-1]
+            for i in range(min(len(old_text) - prefix_len, len(new_text) - prefix_len)):
+                if old_rev[i] == new_rev[i]:
+                    suffix_len += 1
                 else:
-                    # Continue current run
-                    current_run.text += char
+                    break
+            
+            # In replacement region - use formatting from before replacement (or after if at start)
+            if prefix_len > 0 and prefix_len < len(old_text):
+                # Use formatting from character just before replacement
+                replacement_source = prefix_len - 1
+            elif suffix_len > 0:
+                # Use formatting from character just after replacement
+                replacement_source = len(old_text) - suffix_len
+            elif label_start_pos is not None and label_start_pos < len(old_text):
+                # For label fields, use label's formatting
+                replacement_source = label_start_pos
             else:
-                # No formatting info, add to current run or create plain run
-                if current_run is None:
-                    current_run = para.add_run(char)
-                    current_run_format = None
-                else:
-                    current_run.text += char
+                # Fallback: use formatting from last character
+                replacement_source = len(old_text) - 1
+            
+            source_spans = [
+                (prefix_len, 0, True),  # Before replacement - original positions
+                (len(new_text) - prefix_len - suffix_len, replacement_source, False),
+                (suffix_len, len(old_text) - suffix_len, True),  # After replacement - shifted positions
+            ]
+        
+        # Split new text into (text, source run) pieces. Formatting can only change at run
+        # boundaries, so copied spans are walked run by run rather than character by character
+        pieces = []
+        new_pos = 0
+        for length, old_pos, copy in source_spans:
+            if length <= 0:
+                continue
+            run_idx = bisect_right(run_starts, old_pos) - 1
+            if not copy:
+                pieces.append((new_text[new_pos:new_pos + length], run_idx))
+                new_pos += length
+                continue
+            
+            span_end = new_pos + length
+            while new_pos < span_end:
+                run_end = run_starts[run_idx + 1] if run_idx + 1 < len(run_starts) else len(old_text)
+                take = min(run_end - old_pos, span_end - new_pos)
+                pieces.append((new_text[new_pos:new_pos + take], run_idx))
+                new_pos += take
+                old_pos += take
+                run_idx += 1
+        
+        # Build runs for new text: adjacent pieces with identical formatting are merged and
+        # each formatting group is written as a single run carrying a copy of the source rPr
+        groups = []
+        for text, run_idx in pieces:
+            if groups and run_format_keys[groups[-1][0]] == run_format_keys[run_idx]:
+                groups[-1][1].append(text)
+            else:
+                groups.append((run_idx, [text]))
+        
+        for run_idx, texts in groups:
+            run = para.add_run(''.join(texts))
+            rPr = run_rprs[run_idx]
+            if rPr is not None:
+                run._r.insert(0, deepcopy(rPr))
+    
+    @staticmethod
+    def _is_explicit_placeholder(placeholder: str) -> bool:
+        """Explicit placeholders are bracketed or contain underscores; anything else is a label field"""
+        return (
+            (placeholder.startswith('[') and placeholder.endswith(']')) or
+            (placeholder.startswith('{') and placeholder.endswith('}')) or
+            (placeholder.startswith('(') and placeholder.endswith(')')) or
+            (placeholder.startswith('<') and placeholder.endswith('>')) or
+            '_' in placeholder  # Underscores are explicit
+        )
+    
+    def is_explicit_placeholder(self, placeholder: str) -> bool:
+        """Return True for explicit placeholders (replaced entirely), False for label fields"""
+        return self._classify(placeholder)[0]
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _classify(placeholder: str) -> Tuple[bool, Tuple[str, ...]]:
+        """
+        Classify a placeholder and build the text patterns to search for, cached per placeholder.
+        
+        Args:
+            placeholder: The placeholder text to find
+        
+        Returns:
+            (is_explicit, patterns_to_try). The last pattern is contained in every other one,
+            so paragraphs without it cannot match any pattern.
+        """
+        if DocumentHandler._is_explicit_placeholder(placeholder):
+            return True, (placeholder,)
+        
+        # For label fields, try variations with/without colon, spaces, etc.
+        base = placeholder.rstrip(': \t')  # Get the label without trailing space/colon
+        return False, (
+            placeholder,
+            base + ':\t',    # Tab variant
+            base + ':  ',    # Double space variant
+            base + ': ',     # Space variant
+            base + ':',     # Just colon
+            base,           # Just the label name (for cases like "Date2023-10-01" or "The Sum of1200.00")
+        )
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _label_pattern_re(placeholder: str):
+        """
+        Compile the regex locating a label field in paragraph text, cached per placeholder.
+        
+        One case-insensitive regex both detects "label:" and extracts the actual label
+        pattern from text (e.g., 'Address:', ' Address: ', etc.), covering every
+        whitespace variant and preserving ALL whitespace (spaces, tabs, newlines).
+        """
+        base_label = placeholder.rstrip(': \t\n').strip()
+        return re.compile(r'(\s*' + re.escape(base_label) + r'\s*:\s*)', re.IGNORECASE)
+    
+    @staticmethod
+    def _build_label_replaced_text(full_para_text: str, label_pos: int, pattern: str, value: str) -> str:
+        """
+        Build the paragraph text for a label field: keep the label, add a space, then insert value.
+        
+        Args:
+            full_para_text: Current paragraph text
+            label_pos: Position of pattern in full_para_text
+            pattern: The matched label pattern (e.g. 'Address: ', 'Date')
+            value: The replacement value
+        
+        Returns:
+            The new paragraph text
+        """
+        label_end = label_pos + len(pattern)
+        
+        # Strip trailing spaces from pattern to get actual label end
+        label_without_trailing_space = pattern.rstrip(' \t')
+        actual_label_end = label_pos + len(label_without_trailing_space)
+        
+        # Check what comes after the label (by index, without slicing the rest of the paragraph)
+        if label_end < len(full_para_text) and not full_para_text[label_end].isspace():
+            # There's text immediately after label (no space), replace it
+            # Find where the existing value ends (look for space, newline, or end)
+            match = _EXISTING_VALUE_RE.match(full_para_text, label_end)
+            if match:
+                # Replace the existing value
+                return full_para_text[:label_end] + ' ' + value + full_para_text[match.end():]
+            # No clear existing value, just append
+            return full_para_text[:label_end] + ' ' + value
+        
+        # There's whitespace/blank lines after label - REPLACE them with value
+        # For label fields, we want: label + ' ' + value (all on same line)
+        # Replace ALL whitespace/newlines after label with just space + value
+        match = _BLANK_RE.match(full_para_text, actual_label_end)
+        if match and match.end() < len(full_para_text):
+            # The whitespace run is maximal, so anything after it is content - keep it
+            return full_para_text[:actual_label_end] + ' ' + value + ' ' + full_para_text[match.end():]
+        # No content after whitespace (or no blank content), just label + space + value
+        return full_para_text[:actual_label_end] + ' ' + value
     
-    def replace_placeholder(self, placeholder: str, value: str) -> bool:
+    def replace_placeholder(self, placeholder: str, value: str, first_only: bool = False) -> bool:
         """
         Replace placeholder with value.
         
@@ -204,87 +372,45 @@ class DocumentHandler:
         Args:
             placeholder: The placeholder text to find
             value: The replacement value
+            first_only: For explicit placeholders known to occur once, stop after the first
+                        replaced paragraph instead of scanning the rest of the document
+                        (label fields always scan every paragraph, their variants can match anywhere)
         
         Returns:
             True if replacement was successful
         """
+        return self._replace_placeholder_count(placeholder, value, first_only) > 0
+    
+    def _replace_placeholder_count(self, placeholder: str, value: str, first_only: bool = False) -> int:
+        """
+        Replace placeholder with value as replace_placeholder does.
+        
+        Returns:
+            Number of paragraphs in which the placeholder was replaced
+        """
+        replaced_count = 0
         try:
-            replaced_count = 0
-            
-            # Determine type: explicit placeholder or label field
-            is_explicit_placeholder = (
-                (placeholder.startswith('[') and placeholder.endswith(']')) or
-                (placeholder.startswith('{') and placeholder.endswith('}')) or
-                (placeholder.startswith('(') and placeholder.endswith(')')) or
-                (placeholder.startswith('<') and placeholder.endswith('>')) or
-                '_' in placeholder  # Underscores are explicit
-            )
-            
-            is_label_field = not is_explicit_placeholder  # Any non-bracketed placeholder is a label field
-            
-            # Build list of patterns to try (handle whitespace variations)
-            patterns_to_try = [placeholder]
-            if is_label_field:
-                # For label fields, try variations with/without colon, spaces, etc.
-                base = placeholder.rstrip(': \t')  # Get the label without trailing space/colon
-                patterns_to_try.extend([
-                    base + ':\t',    # Tab variant
-                    base + ':  ',    # Double space variant
-                    base + ': ',     # Space variant
-                    base + ':',     # Just colon
-                    base,           # Just the label name (for cases like "Date2023-10-01" or "The Sum of1200.00")
-                ])
+            # Determine type (explicit placeholder or label field) and the patterns to try
+            # Every pattern contains required_text, so paragraphs without it can be skipped
+            is_explicit_placeholder, patterns_to_try = self._classify(placeholder)
+            required_text = patterns_to_try[-1]
             
-            # Replace in paragraphs
-            for para in self.doc.paragraphs:
-                full_para_text = ''.join([run.text for run in para.runs])
+            # Replace in body paragraphs and table cells
+            for para in self._iter_all_paragraphs():
+                full_para_text = self._get_para_text(para)
+                if required_text not in full_para_text:
+                    continue
                 
                 for pattern in patterns_to_try:
                     if pattern in full_para_text:
                         if is_explicit_placeholder:
-                            # Replace entire placeholder
+                            # Replace entire placeholder (only the FIRST occurrence in this paragraph)
                             new_text = full_para_text.replace(pattern, value, 1)
                         else:
                             # Label field: keep label, add space, then insert value
                             label_pos = full_para_text.find(pattern)
                             if label_pos != -1:
-                                label_end = label_pos + len(pattern)
-                                remaining_text = full_para_text[label_end:]
-                                
-                                # Strip trailing spaces from pattern to get actual label end
-                                label_without_trailing_space = pattern.rstrip(' \t')
-                                actual_label_end = label_pos + len(label_without_trailing_space)
-                                remaining_after_label = full_para_text[actual_label_end:]
-                                
-                                # Check what comes after the label
-                                if remaining_text and not remaining_text[0].isspace():
-                                    # There's text immediately after label (no space), replace it
-                                    # Find where the existing value ends (look for space, newline, or end)
-                                    match = re.match(r'^([^\s\n]+)', remaining_text)
-                                    if match:
-                                        # Replace the existing value
-                                        existing_value_end = match.end()
-                                        new_text = full_para_text[:label_end] + ' ' + value + remaining_text[existing_value_end:]
-                                    else:
-                                        # No clear existing value, just append
-                                        new_text = full_para_text[:label_end] + ' ' + value
-                                else:
-                                    # There's whitespace/blank lines after label - REPLACE them with value
-                                    # For label fields, we want: label + ' ' + value (all on same line)
-                                    # Replace ALL whitespace/newlines after label with just space + value
-                                    match = re.match(r'^[\s\n\t]+', remaining_after_label)
-                                    if match:
-                                        # Replace the blank content
-                                        after_whitespace = remaining_after_label[match.end():]
-                                        if after_whitespace.strip():
-                                            # There's content after whitespace, keep it
-                                            new_text = full_para_text[:actual_label_end] + ' ' + value + ' ' + after_whitespace
-                                        else:
-                                            # No content after whitespace, just replace with label + space + value
-                                            new_text = full_para_text[:actual_label_end] + ' ' + value
-                                    else:
-                                        # No blank content, just append value with space
-                                        new_text = full_para_text[:actual_label_end] + ' ' + value
+                                new_text = self._build_label_replaced_text(full_para_text, label_pos, pattern, value)
                             else:
                                 continue
                         
@@ -292,65 +418,119 @@ class DocumentHandler:
                             # Preserve formatting by modifying runs in place
                             self._replace_text_preserving_format(para, new_text, label_pos if not is_explicit_placeholder else None)
                             replaced_count += 1
+                            if first_only and is_explicit_placeholder:
+                                return replaced_count
                             break  # Move to next paragraph
             
-            # Replace in table cells
-            for table in self.doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        for para in cell.paragraphs:
-                            full_para_text = ''.join([run.text for run in para.runs])
-                            
-                            for pattern in patterns_to_try:
-                                if pattern in full_para_text:
-                                    if is_explicit_placeholder:
-                                        # Replace only the FIRST occurrence (same placeholder might mean different things)
-                                        new_text = full_para_text.replace(pattern, value, 1)
-                                    else:
-                                        # Label field: keep label, add space, then insert value
-                                        label_pos = full_para_text.find(pattern)
-                                        if label_pos != -1:
-                                            label_end = label_pos + len(pattern)
-                                            remaining_text = full_para_text[label_end:]
-                                            
-                                            # Strip trailing spaces from pattern to get actual label end
-                                            label_without_trailing_space = pattern.rstrip(' \t')
-                                            actual_label_end = label_pos + len(label_without_trailing_space)
-                                            remaining_after_label = full_para_text[actual_label_end:]
-                                            
-                                            # Check what comes after the label
-                                            if remaining_text and not remaining_text[0].isspace():
-                                                # There's text immediately after label, replace it
-                                                match = re.match(r'^([^\s\n]+)', remaining_text)
-                                                if match:
-                                                    existing_value_end = match.end()
-                                                    new_text = full_para_text[:label_end] + ' ' + value + remaining_text[existing_value_end:]
-                                                else:
-                                                    new_text = full_para_text[:label_end] + ' ' + value
-                                            else:
-                                                # There's whitespace/blank lines after label - REPLACE them with value
-                                                match = re.match(r'^[\s\n\t]+', remaining_after_label)
-                                                if match:
-                                                    after_whitespace = remaining_after_label[match.end():]
-                                                    if after_whitespace.strip():
-                                                        new_text = full_para_text[:actual_label_end] + ' ' + value + ' ' + after_whitespace
-                                                    else:
-                                                        new_text = full_para_text[:actual_label_end] + ' ' + value
-                                                else:
-                                                    new_text = full_para_text[:actual_label_end] + ' ' + value
-                                        else:
-                                            continue
-                                    
-                                    if new_text != full_para_text:
-                                        # Preserve formatting by modifying runs in place
-                                        self._replace_text_preserving_format(para, new_text, label_pos if not is_explicit_placeholder else None)
-                                        replaced_count += 1
-                                        break  # Move to next paragraph
-            
-            return replaced_count > 0
+            return replaced_count
         except Exception as e:
             print(f"Error replacing placeholder: {e}", file=sys.stderr)
-            return False
+            return replaced_count
+    
+    def replace_placeholders(self, replacements: Dict[str, str]) -> Dict[str, int]:
+        """
+        Replace every occurrence of many placeholders in a single pass over the document.
+        
+        All explicit placeholders are combined into one regex, so each paragraph is scanned once
+        and rewritten at most once however many placeholders it contains. At a given position the
+        longest placeholder wins (e.g. "{{name}}" over "{name}"). Label fields need per-label
+        handling and are replaced as replace_placeholder does, counting each filled paragraph.
+        
+        Args:
+            replacements: Dictionary mapping placeholder text -> replacement value
+        
+        Returns:
+            Dictionary mapping placeholder text -> number of occurrences replaced
+        """
+        counts = {placeholder: 0 for placeholder in replacements}
+        explicit = {}
+        
+        for placeholder, value in replacements.items():
+            if not placeholder:
+                continue
+            if self._classify(placeholder)[0]:
+                explicit[placeholder] = value
+            else:
+                counts[placeholder] = self._replace_placeholder_count(placeholder, value)
+        
+        if not explicit:
+            return counts
+        
+        try:
+            combined_re = re.compile('|'.join(re.escape(p) for p in sorted(explicit, key=len, reverse=True)))
+            
+            for para in self._iter_all_paragraphs():
+                full_para_text = self._get_para_text(para)
+                
+                new_parts = []
+                source_spans = []
+                last_end = 0
+                for match in combined_re.finditer(full_para_text):
+                    start, end = match.span()
+                    placeholder = match.group(0)
+                    value = explicit[placeholder]
+                    counts[placeholder] += 1
+                    
+                    # Unchanged text keeps its own formatting; the value takes the formatting of the
+                    # character before the placeholder (or after it, or the last one, if there is none)
+                    new_parts.append(full_para_text[last_end:start])
+                    source_spans.append((start - last_end, last_end, True))
+                    if start > 0:
+                        value_source = start - 1
+                    elif end < len(full_para_text):
+                        value_source = end
+                    else:
+                        value_source = len(full_para_text) - 1
+                    new_parts.append(value)
+                    source_spans.append((len(value), value_source, False))
+                    last_end = end
+                
+                if not new_parts:
+                    continue
+                
+                new_parts.append(full_para_text[last_end:])
+                source_spans.append((len(full_para_text) - last_end, last_end, True))
+                self._replace_text_preserving_format(para, ''.join(new_parts), source_spans=source_spans)
+            
+            return counts
+        except Exception as e:
+            print(f"Error replacing placeholders: {e}", file=sys.stderr)
+            return counts
+    
+    def replace_placeholder_all(self, placeholder: str, value: str) -> int:
+        """
+        Replace every occurrence of a placeholder in a single pass over the document.
+        
+        Explicit placeholders are replaced wherever they appear; label fields get the value
+        inserted after the first label match of each paragraph containing the label.
+        
+        Args:
+            placeholder: The placeholder text to find
+            value: The replacement value
+        
+        Returns:
+            Number of occurrences replaced
+        """
+        if self._classify(placeholder)[0]:
+            return self.replace_placeholders({placeholder: value})[placeholder]
+        
+        replaced_count = 0
+        try:
+            label_pattern_re = self._label_pattern_re(placeholder)
+            for para in self._iter_all_paragraphs():
+                full_para_text = self._get_para_text(para)
+                match = label_pattern_re.search(full_para_text)
+                if not match:
+                    continue
+                
+                label_pos = match.start()
+                new_text = self._build_label_replaced_text(full_para_text, label_pos, match.group(1), value)
+                self._replace_text_preserving_format(para, new_text, label_pos)
+                replaced_count += 1
+            return replaced_count
+        except Exception as e:
+            print(f"Error replacing all placeholder occurrences: {e}", file=sys.stderr)
+            return replaced_count
     
     def replace_placeholder_at_position(self, placeholder: str, value: str, position_index: int = 0) -> bool:
         """
@@ -365,134 +545,46 @@ class DocumentHandler:
             True if replacement was successful
         """
         try:
-            # Determine type
-            is_explicit_placeholder = (
-                (placeholder.startswith('[') and placeholder.endswith(']')) or
-                (placeholder.startswith('{') and placeholder.endswith('}')) or
-                (placeholder.startswith('(') and placeholder.endswith(')')) or
-                (placeholder.startswith('<') and placeholder.endswith('>')) or
-                '_' in placeholder
-            )
+            # Determine type and patterns
+            is_explicit_placeholder, patterns_to_try = self._classify(placeholder)
             is_label_field = not is_explicit_placeholder
             
-            # Build patterns
-            patterns_to_try = [placeholder]
-            if is_label_field:
-                base = placeholder.rstrip(': \t\n').strip()  # Strip both leading and trailing whitespace
-                # Try common variations - use a reasonable set of leading space patterns
-                # Most documents use 0-20 spaces for indentation
-                for i in range(0, 21):  # 0 to 20 leading spaces
-                    leading_spaces = ' ' * i
-                    patterns_to_try.extend([
-                        leading_spaces + base + ':\t',
-                        leading_spaces + base + ':  ',
-                        leading_spaces + base + ': ',
-                        leading_spaces + base + ':',
-                    ])
-                # Also try without leading spaces (already covered but explicit)
-                patterns_to_try.extend([
-                    base + ':\t',
-                    base + ':  ',
-                    base + ': ',
-                    base + ':',
-                    base,           # Just the label name
-                ])
-            
-            # Collect all occurrences
-            occurrences = []
-            seen_paragraphs = set()  # Track which paragraphs we've already added
+            # Find the target occurrence, counting occurrences in document order and stopping at
+            # the target. Paragraphs of merged cells are visited once per spanned grid cell, the
+            # same way their text repeats in the detected document text, so indices stay aligned
+            target = None
+            occurrence_idx = 0
             
             # For label fields, use normalized matching to handle whitespace variations
             if is_label_field:
-                base_label = placeholder.rstrip(': \t\n').strip().lower()
-                
-                def matches_label(text, label_base):
-                    """Check if text contains the label (ignoring leading/trailing whitespace)"""
-                    # Normalize: remove leading/trailing whitespace and check if label: appears
-                    normalized = text.strip().lower()
-                    # Check if label: appears anywhere (with flexible whitespace)
-                    import re
-                    pattern = r'\s*' + re.escape(label_base) + r'\s*:'
-                    return bool(re.search(pattern, normalized))
+                label_pattern_re = self._label_pattern_re(placeholder)
                 
-                def extract_label_pattern(text, label_base):
-                    """Extract the actual label pattern from text (e.g., 'Address:', ' Address: ', etc.)"""
-                    import re
-                    # Find the label with flexible whitespace - preserve ALL whitespace (spaces, tabs, newlines)
-                    # Match: any whitespace + label + any whitespace + colon + any whitespace
-                    pattern = r'(\s*' + re.escape(label_base) + r'\s*:\s*)'
-                    match = re.search(pattern, text, re.IGNORECASE)
+                for para in self._iter_all_paragraphs():
+                    full_text = self._get_para_text(para)
+                    match = label_pattern_re.search(full_text)
                     if match:
-                        return match.group(1)  # Return the actual matched text WITH all whitespace preserved
-                    return None
-                
-                for para in self.doc.paragraphs:
-                    full_text = ''.join([run.text for run in para.runs])
-                    para_id = id(para)
-                    if para_id not in seen_paragraphs and matches_label(full_text, base_label):
-                        # Extract the actual pattern from the text (handles any whitespace variation)
-                        matching_pattern = extract_label_pattern(full_text, base_label)
-                        if not matching_pattern:
-                            # Fallback: try patterns_to_try
-                            for pattern in patterns_to_try:
-                                if pattern in full_text:
-                                    matching_pattern = pattern
-                                    break
-                        
-                        if matching_pattern:
-                            occurrences.append((para, matching_pattern, full_text))
-                            seen_paragraphs.add(para_id)
-                
-                for table in self.doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            for para in cell.paragraphs:
-                                full_text = ''.join([run.text for run in para.runs])
-                                para_id = id(para)
-                                if para_id not in seen_paragraphs and matches_label(full_text, base_label):
-                                    # Extract the actual pattern from the text
-                                    matching_pattern = extract_label_pattern(full_text, base_label)
-                                    if not matching_pattern:
-                                        # Fallback: try patterns_to_try
-                                        for pattern in patterns_to_try:
-                                            if pattern in full_text:
-                                                matching_pattern = pattern
-                                                break
-                                    
-                                    if matching_pattern:
-                                        occurrences.append((para, matching_pattern, full_text))
-                                        seen_paragraphs.add(para_id)
+                        if occurrence_idx == position_index:
+                            target = (para, match.group(1), full_text)
+                            break
+                        occurrence_idx += 1
             else:
                 # For explicit placeholders, use exact matching
-                for para in self.doc.paragraphs:
-                    full_text = ''.join([run.text for run in para.runs])
+                for para in self._iter_all_paragraphs():
+                    full_text = self._get_para_text(para)
                     for pattern in patterns_to_try:
                         if pattern in full_text:
-                            para_id = id(para)
-                            if para_id not in seen_paragraphs:
-                                occurrences.append((para, pattern, full_text))
-                                seen_paragraphs.add(para_id)
                             break
-                
-                for table in self.doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            for para in cell.paragraphs:
-                                full_text = ''.join([run.text for run in para.runs])
-                                para_id = id(para)
-                                if para_id in seen_paragraphs:
-                                    continue
-                                for pattern in patterns_to_try:
-                                    if pattern in full_text:
-                                        occurrences.append((para, pattern, full_text))
-                                        seen_paragraphs.add(para_id)
-                                        break
+                    else:
+                        continue
+                    if occurrence_idx == position_index:
+                        target = (para, pattern, full_text)
+                        break
+                    occurrence_idx += 1
             
-            # Get target occurrence
-            if position_index >= len(occurrences):
+            if target is None:
                 return False
             
-            target_para, matching_pattern, full_para_text = occurrences[position_index]
+            target_para, matching_pattern, full_para_text = target
             
             # Replace
             if is_explicit_placeholder:
@@ -501,34 +593,7 @@ class DocumentHandler:
                 # Label field: keep label, add space, then insert value
                 label_pos = full_para_text.find(matching_pattern)
                 if label_pos != -1:
-                    label_end = label_pos + len(matching_pattern)
-                    remaining_text = full_para_text[label_end:]
-                    
-                    # Strip trailing spaces from pattern to get actual label end
-                    label_without_trailing_space = matching_pattern.rstrip(' \t')
-                    actual_label_end = label_pos + len(label_without_trailing_space)
-                    remaining_after_label = full_para_text[actual_label_end:]
-                    
-                    # Check what comes after the label
-                    if remaining_text and not remaining_text[0].isspace():
-                        # There's text immediately after label, replace it
-                        match = re.match(r'^([^\s\n]+)', remaining_text)
-                        if match:
-                            existing_value_end = match.end()
-                            new_text = full_para_text[:label_end] + ' ' + value + remaining_text[existing_value_end:]
-                        else:
-                            new_text = full_para_text[:label_end] + ' ' + value
-                    else:
-                        # There's whitespace/blank lines after label - REPLACE them with value
-                        match = re.match(r'^[\s\n\t]+', remaining_after_label)
-                        if match:
-                            after_whitespace = remaining_after_label[match.end():]
-                            if after_whitespace.strip():
-                                new_text = full_para_text[:actual_label_end] + ' ' + value + ' ' + after_whitespace
-                            else:
-                                new_text = full_para_text[:actual_label_end] + ' ' + value
-                        else:
-                            new_text = full_para_text[:actual_label_end] + ' ' + value
+                    new_text = self._build_label_replaced_text(full_para_text, label_pos, matching_pattern, value)
                 else:
                     return False
             
@@ -539,10 +604,118 @@ class DocumentHandler:
             print(f"Error replacing placeholder at position: {e}", file=sys.stderr)
             return False
     
+    def replace_placeholder_at_offset(self, placeholder: str, value: str, offset: int) -> bool:
+        """
+        Replace placeholder in the paragraph at a given offset of the document text.
+        
+        The offset refers to the text as loaded (e.g. a detected Placeholder.position), so it stays
+        valid while other replacements rewrite the document and the paragraph is looked up directly
+        instead of being searched for. The match starting at the offset is replaced; if an earlier
+        replacement in the paragraph moved it, the first match in the paragraph is replaced instead.
+        Several placeholders in one paragraph should therefore be replaced last to first.
+        
+        Args:
+            placeholder: The placeholder text to find
+            value: The replacement value
+            offset: Position of the placeholder in the document text as loaded
+        
+        Returns:
+            True if replacement was successful
+        """
+        try:
+            if self._para_offsets is None:
+                # Document not loaded
+                return False
+            starts, paragraphs = self._para_offsets
+            
+            para_idx = bisect_right(starts, offset) - 1
+            if para_idx < 0:
+                return False
+            para = paragraphs[para_idx]
+            full_para_text = self._get_para_text(para)
+            para_pos = offset - starts[para_idx]
+            
+            if self._classify(placeholder)[0]:
+                if full_para_text.startswith(placeholder, para_pos):
+                    pos = para_pos
+                else:
+                    pos = full_para_text.find(placeholder)
+                    if pos < 0:
+                        return False
+                new_text = full_para_text[:pos] + value + full_para_text[pos + len(placeholder):]
+                self._replace_text_preserving_format(para, new_text)
+                return True
+            
+            # Label field: keep label, add space, then insert value
+            label_pattern_re = self._label_pattern_re(placeholder)
+            match = label_pattern_re.match(full_para_text, para_pos) or label_pattern_re.search(full_para_text)
+            if not match:
+                return False
+            label_pos = match.start()
+            new_text = self._build_label_replaced_text(full_para_text, label_pos, match.group(1), value)
+            self._replace_text_preserving_format(para, new_text, label_pos)
+            return True
+        except Exception as e:
+            print(f"Error replacing placeholder at offset: {e}", file=sys.stderr)
+            return False
+    
     def save_document(self, output_path: str) -> bool:
         """Save the modified document to a new file"""
         try:
             self.doc.save(output_path)
+            self._cache_package_parts(output_path)
+            return True
+        except Exception as e:
+            print(f"Error saving document: {e}", file=sys.stderr)
+            return False
+    
+    def _cache_package_parts(self, saved_path: str):
+        """Keep the serialized parts of a saved package so later saves only rewrite the main document part"""
+        if self._cached_parts is not None:
+            return
+        try:
+            document_name = self.doc.part.partname.lstrip('/')
+            parts = []
+            with zipfile.ZipFile(saved_path) as z:
+                for info in z.infolist():
+                    data = None if info.filename == document_name else z.read(info)
+                    parts.append((info.filename, info.compress_type, data))
+            self._cached_parts = parts
+        except Exception as e:
+            # Not fatal: the document was saved, later saves just take the full path
+            print(f"Error caching document parts: {e}", file=sys.stderr)
+    
+    def save_document_fast(self, output_path: str) -> bool:
+        """
+        Save the document, re-serializing only the main document part.
+        
+        Replacements only touch the body paragraphs and tables, so styles, media, headers and the
+        rest of the package are written from the bytes cached by the first save_document() call.
+        Falls back to a full save when nothing has been cached yet. A document that has not been
+        modified since loading is copied from the source file without re-serializing anything.
+        
+        Args:
+            output_path: Path of the .docx file to write
+        
+        Returns:
+            True if the document was saved
+        """
+        if not self._modified:
+            try:
+                if not (os.path.exists(output_path) and os.path.samefile(self.doc_path, output_path)):
+                    shutil.copyfile(self.doc_path, output_path)
+                return True
+            except OSError as e:
+                # Source file unavailable - serialize the loaded document instead
+                print(f"Error copying unmodified document: {e}", file=sys.stderr)
+        
+        if self._cached_parts is None:
+            return self.save_document(output_path)
+        try:
+            document_xml = serialize_part_xml(self.doc.element)
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as z:
+                for name, compress_type, data in self._cached_parts:
+                    z.writestr(name, document_xml if data is None else data, compress_type=compress_type)
             return True
         except Exception as e:
             print(f"Error saving document: {e}", file=sys.stderr)
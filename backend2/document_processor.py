@@ -5,7 +5,14 @@ Orchestrates placeholder detection and replacement
 
 import os
 import sys
+import re
+import hashlib
 import json
+import tempfile
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from copy import deepcopy
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
 from document_handler import DocumentHandler
@@ -15,6 +22,74 @@ from llm_analyzer import LLMAnalyzer, PlaceholderAnalysis
 # Check if verbose logging is enabled (for production, set VERBOSE_LOGGING=false)
 VERBOSE_LOGGING = os.getenv('VERBOSE_LOGGING', 'false').lower() == 'true'
 
+# Project output folder used for filled documents in development
+_PROJECT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "output")
+
+# Position-based key: placeholder text, then "__pos_" and the 0-based occurrence index
+_POSITION_KEY_RE = re.compile(r'(.*)__pos_(\d+)', re.DOTALL)
+
+# process() results keyed by a digest of the document file's bytes, as (full_text, placeholders,
+# result); oldest entries are evicted first. Uploads are saved under reused names, so neither the
+# path nor the file's mtime and size identify a document
+_PROCESS_CACHE: Dict[str, Tuple[str, list, Dict]] = {}
+_PROCESS_CACHE_LIMIT = 64
+
+
+# Common field name to label mappings, used to score field-based matches (lowercase)
+_FIELD_LABEL_MAPPINGS = {
+    'purchase_amount': ('purchase amount', 'the purchase amount'),
+    'post_money_valuation_cap': ('post-money valuation cap', 'post money valuation cap', 'valuation cap'),
+    'pre_money_valuation_cap': ('pre-money valuation cap', 'pre money valuation cap'),
+    'discount_rate': ('discount rate', 'discount'),
+    'conversion_price': ('conversion price', 'safe price'),
+}
+
+
+def _contains_label(text: str) -> bool:
+    r"""
+    Check whether text contains a label, i.e. a word followed by a colon.
+    
+    Same result as searching for r'\b\w+\s*:', using str.find instead of the regex engine.
+    """
+    colon = text.find(':')
+    while colon != -1:
+        # Skip whitespace between the colon and the word before it
+        i = colon - 1
+        while i >= 0 and text[i].isspace():
+            i -= 1
+        if i >= 0 and (text[i].isalnum() or text[i] == '_'):
+            return True
+        colon = text.find(':', colon + 1)
+    return False
+
+
+@lru_cache(maxsize=4096)
+def _normalize_for_matching(text: str) -> str:
+    """Normalize text by extracting base label name"""
+    if ':' in text:
+        # Label field: extract label name before colon
+        return text.split(':')[0].strip().lower()
+    return text.strip().lower()
+
+
+def _find_all(text: str, term: str) -> List[int]:
+    """Return the start offset of every (possibly overlapping) occurrence of term in text"""
+    starts = []
+    pos = text.find(term)
+    while pos != -1:
+        starts.append(pos)
+        pos = text.find(term, pos + 1)
+    return starts
+
+
+# (opening, closing) characters of bracketed placeholders
+_BRACKET_PAIRS = frozenset([('[', ']'), ('{', '}'), ('(', ')')])
+
+
+def _has_brackets(text: str) -> bool:
+    """Check whether text is wrapped in square, curly or round brackets"""
+    return len(text) >= 2 and (text[0], text[-1]) in _BRACKET_PAIRS
+
 
 class DocumentProcessor:
     def __init__(self, doc_path: str):
@@ -25,13 +100,59 @@ class DocumentProcessor:
             doc_path: Path to the .docx file
         """
         self.doc_path = doc_path
+        # Output filename based on input filename
+        self._output_filename = f"{os.path.splitext(os.path.basename(doc_path))[0]}_filled.docx"
         self.doc_handler = DocumentHandler(doc_path)
         self.placeholder_detector = PlaceholderDetector()
         self.llm_analyzer = None
         
+        self.placeholder_analyses = None
+        self._source_stamp = None  # (mtime_ns, size) of the file the placeholders were detected in
         self.full_text = None
         self.placeholders = None
-        self.placeholder_analyses = None
+        self._reset_detection_state()
+    
+    def _detect_placeholders(self, full_text: str, placeholders: Optional[list] = None):
+        """
+        Set the document text, detect its placeholders and drop everything derived from the old ones
+        
+        Args:
+            full_text: Document text
+            placeholders: Placeholders already detected in full_text (detected here if None)
+        """
+        self.full_text = full_text
+        if placeholders is None:
+            placeholders = self.placeholder_detector.detect_placeholders(full_text)
+        self.placeholders = placeholders
+        self._reset_detection_state()
+    
+    def _reset_detection_state(self):
+        """Drop everything derived from the current text and placeholders"""
+        # Built on first use from full_text and placeholders
+        self._placeholder_counts = None  # placeholder text -> occurrences
+        self._name_to_texts = None  # extracted name -> distinct placeholder texts with that name
+        self._placeholder_match_keys = None  # per-placeholder field matching keys
+        self._lowered_text = None  # full_text lowercased, for context scoring
+        self._term_starts = {}  # context scoring term -> start offsets in _lowered_text
+    
+    def _get_source_stamp(self) -> Optional[Tuple[int, int]]:
+        """Return (mtime_ns, size) of the document file, or None if it cannot be read"""
+        try:
+            st = os.stat(self.doc_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _get_content_digest(self) -> Optional[str]:
+        """Return a digest of the document file's contents, or None if it cannot be read"""
+        digest = hashlib.blake2b(digest_size=32)
+        try:
+            with open(self.doc_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        except OSError:
+            return None
+        return digest.hexdigest()
     
     def process(self) -> Dict:
         """
@@ -43,17 +164,29 @@ class DocumentProcessor:
         Returns:
             Dictionary with processing results
         """
+        # Reuse the result of an earlier run on a file with the same contents; the document
+        # itself is loaded again by fill_placeholders() if it is needed
+        source_stamp = self._get_source_stamp()
+        cache_key = self._get_content_digest()
+        cached = _PROCESS_CACHE.get(cache_key) if cache_key else None
+        if cached is not None:
+            full_text, placeholders, result = cached
+            self._source_stamp = source_stamp
+            self._detect_placeholders(full_text, placeholders)
+            result = deepcopy(result)
+            result["document_path"] = self.doc_path
+            return result
+        
         # Step 1: Load document
         if not self.doc_handler.load_document():
             return {"error": "Failed to load document"}
-        
-        self.full_text = self.doc_handler.get_full_text()
+        self._source_stamp = source_stamp
         
         # Step 2: Detect placeholders
-        self.placeholders = self.placeholder_detector.detect_placeholders(self.full_text)
+        self._detect_placeholders(self.doc_handler.get_full_text())
         
         if not self.placeholders:
-            return {
+            result = {
                 "success": True,
                 "message": "Document loaded but no placeholders detected",
                 "document_path": self.doc_path,
@@ -61,13 +194,15 @@ class DocumentProcessor:
                 "placeholder_count": 0,
                 "placeholders": [],
             }
+            self._cache_result(cache_key, result)
+            return result
         
         # Convert to dict format for JSON serialization
-        placeholders_data = []
         # Group placeholders by text to show occurrences
-        placeholder_groups = {}
+        placeholder_groups = defaultdict(list)
         for idx, p in enumerate(self.placeholders):
-            placeholder_groups.setdefault(p.text, []).append({
+            group = placeholder_groups[p.text]
+            group.append({
                 'index': idx,
                 'text': p.text,
                 'name': p.name,
@@ -75,17 +210,15 @@ class DocumentProcessor:
                 'position': p.position,
                 'end_position': p.end_position,
                 'detected_by': p.detected_by,
-                'position_index': len(placeholder_groups.get(p.text, []))  # 0-based index for this specific placeholder text
+                'position_index': len(group)  # 0-based index for this specific placeholder text
             })
         
-        # Flatten for backward compatibility
-        for group in placeholder_groups.values():
-            placeholders_data.extend(group)
+        # Flatten for backward compatibility (groups in first-appearance order, as clients
+        # derive placeholder ids from the index in this list)
+        placeholders_data = [entry for group in placeholder_groups.values() for entry in group]
         
-        # Add summary of occurrences
-        occurrences_summary = {}
-        for text, occurrences in placeholder_groups.items():
-            occurrences_summary[text] = len(occurrences)
+        # Add summary of occurrences (one entry per distinct text, not per placeholder)
+        occurrences_summary = {text: len(occurrences) for text, occurrences in placeholder_groups.items()}
         
         result = {
             "success": True,
@@ -97,8 +230,63 @@ class DocumentProcessor:
             "occurrences_summary": occurrences_summary  # Shows how many times each placeholder appears
         }
         
+        self._cache_result(cache_key, result)
         return result
     
+    def _cache_result(self, cache_key: Optional[str], result: Dict):
+        """Store a copy of a process() result with the text and placeholders it was built from"""
+        if cache_key is None:
+            return
+        _PROCESS_CACHE[cache_key] = (self.full_text, self.placeholders, deepcopy(result))
+        while len(_PROCESS_CACHE) > _PROCESS_CACHE_LIMIT:
+            del _PROCESS_CACHE[next(iter(_PROCESS_CACHE))]
+    
+    def _get_placeholder_counts(self) -> Counter:
+        """Return how many times each placeholder text was detected, counted once per detection run"""
+        if self._placeholder_counts is None:
+            self._placeholder_counts = Counter(p.text for p in self.placeholders)
+        return self._placeholder_counts
+    
+    def _get_name_to_texts(self) -> Dict[str, List[str]]:
+        """Return the distinct placeholder texts of each extracted name, in order of first appearance"""
+        if self._name_to_texts is None:
+            self._name_to_texts = defaultdict(list)
+            for text, name in {p.text: p.name for p in self.placeholders}.items():
+                self._name_to_texts[name].append(text)
+        return self._name_to_texts
+    
+    def _get_placeholder_match_keys(self) -> List[Tuple[str, bool, str]]:
+        """
+        Return the keys used to match field-based entries, one tuple per detected placeholder:
+        (normalized text, whether it is bracketed, lowercased text inside the brackets)
+        """
+        if self._placeholder_match_keys is None:
+            self._placeholder_match_keys = [
+                (_normalize_for_matching(p.text), _has_brackets(p.text), p.text.strip('[]{}()').strip().lower())
+                for p in self.placeholders
+            ]
+        return self._placeholder_match_keys
+    
+    def _term_in_context(self, term: str, start: int, end: int) -> bool:
+        """
+        Check whether term occurs in the lowercased document text between start and end.
+        
+        The text is lowercased once and each term's occurrences are found once per detection
+        run; a window is then checked by bisecting those offsets, without slicing the text.
+        """
+        if self._lowered_text is None:
+            self._lowered_text = self.full_text.lower()
+        if len(self._lowered_text) != len(self.full_text):
+            # Lowercasing changed the text length, so offsets into it would be wrong
+            return term in self.full_text[start:end].lower()
+        if not term:
+            return True
+        starts = self._term_starts.get(term)
+        if starts is None:
+            starts = self._term_starts[term] = _find_all(self._lowered_text, term)
+        i = bisect_left(starts, start)
+        return i < len(starts) and starts[i] + len(term) <= end
+    
     def fill_placeholders(self, values: Dict[str, str]) -> Tuple[bool, str]:
         """
         Fill placeholders with provided values
@@ -112,28 +300,42 @@ class DocumentProcessor:
             Tuple of (success: bool, output_path: str)
         """
         try:
-            # IMPORTANT: Load the document first!
-            if not self.doc_handler.load_document():
+            # IMPORTANT: Load the document first! A document that process() loaded and
+            # nothing has modified yet can be filled as is, without parsing the file again,
+            # unless the file itself changed since then
+            source_stamp = self._get_source_stamp()
+            source_changed = source_stamp != self._source_stamp
+            if (source_changed or not self.doc_handler.is_loaded()) and not self.doc_handler.load_document():
                 print("Failed to load document")
                 return False, ""
             
             # Ensure placeholders are detected (needed for counting occurrences)
-            if self.placeholders is None:
-                self.full_text = self.doc_handler.get_full_text()
-                self.placeholders = self.placeholder_detector.detect_placeholders(self.full_text)
+            if self.placeholders is None or source_changed:
+                self._source_stamp = source_stamp
+                self._detect_placeholders(self.doc_handler.get_full_text())
+            placeholder_counts = self._get_placeholder_counts()
             
             total_replacements = 0
             
             # Separate different types of keys
             placeholder_keys = {}  # placeholder_text -> value
-            position_based = {}    # placeholder__pos_N -> value
-            field_based = {}      # placeholder__field_fieldname -> value
+            position_based = {}    # placeholder__pos_N -> (placeholder_text, N, value)
+            field_based = defaultdict(list)  # placeholder_text -> [(field_name, value, key)] from placeholder__field_fieldname keys
+            field_based_count = 0
             
             for key, value in values.items():
                 if '__pos_' in key:
-                    position_based[key] = value
+                    # Parse position keys up front; malformed ones are skipped
+                    match = _POSITION_KEY_RE.fullmatch(key)
+                    if match:
+                        position_based[key] = (match.group(1), int(match.group(2)), value)
+                    elif VERBOSE_LOGGING:
+                        print(f"  ✗ Invalid position key format: {key}")
                 elif '__field_' in key:
-                    field_based[key] = value
+                    # Group by placeholder_text to handle multiple occurrences
+                    placeholder_text, field_name = key.rsplit('__field_', 1)
+                    field_based[placeholder_text].append((field_name, value, key))
+                    field_based_count += 1
                 else:
                     # This is a placeholder text
                     placeholder_keys[key] = value
@@ -142,28 +344,22 @@ class DocumentProcessor:
             if position_based:
                 if VERBOSE_LOGGING:
                     print(f"✓ Using {len(position_based)} position-based replacements\n")
-                for key, value in position_based.items():
-                    placeholder_text = key.rsplit('__pos_', 1)[0]
-                    try:
-                        position = int(key.rsplit('__pos_', 1)[1])
-                        success = self.doc_handler.replace_placeholder_at_position(placeholder_text, value, position)
+                for key, (placeholder_text, position, value) in position_based.items():
+                    success = self.doc_handler.replace_placeholder_at_position(placeholder_text, value, position)
+                    if success:
+                        total_replacements += 1
+                        if VERBOSE_LOGGING:
+                            print(f"  ✓ Replaced: {key:40} → {value[:25]}")
+                    else:
+                        # Fallback to regular replacement
+                        success = self.doc_handler.replace_placeholder(placeholder_text, value)
                         if success:
                             total_replacements += 1
                             if VERBOSE_LOGGING:
-                                print(f"  ✓ Replaced: {key:40} → {value[:25]}")
+                                print(f"  ✓ Fallback: {key:40} → {value[:25]}")
                         else:
-                            # Fallback to regular replacement
-                            success = self.doc_handler.replace_placeholder(placeholder_text, value)
-                            if success:
-                                total_replacements += 1
-                                if VERBOSE_LOGGING:
-                                    print(f"  ✓ Fallback: {key:40} → {value[:25]}")
-                            else:
-                                if VERBOSE_LOGGING:
-                                    print(f"  ✗ Failed: {key}")
-                    except Exception as e:
-                        if VERBOSE_LOGGING:
-                            print(f"  Error: {key}: {e}")
+                            if VERBOSE_LOGGING:
+                                print(f"  ✗ Failed: {key}")
                 
                 if VERBOSE_LOGGING:
                     print()
@@ -172,35 +368,15 @@ class DocumentProcessor:
             # IMPORTANT: Replace in reverse order (last to first) to avoid position shifts
             if field_based:
                 if VERBOSE_LOGGING:
-                    print(f"✓ Using {len(field_based)} field-based replacements\n")
+                    print(f"✓ Using {field_based_count} field-based replacements\n")
                 
-                # Group by placeholder_text to handle multiple occurrences
-                placeholder_groups = {}
-                for key, value in field_based.items():
-                    parts = key.rsplit('__field_', 1)
-                    if len(parts) != 2:
-                        if VERBOSE_LOGGING:
-                            print(f"  ✗ Invalid field key format: {key}")
-                        continue
-                    
-                    placeholder_text = parts[0]
-                    field_name = parts[1]
-                    
-                    if placeholder_text not in placeholder_groups:
-                        placeholder_groups[placeholder_text] = []
-                    placeholder_groups[placeholder_text].append((field_name, value, key))
+                # Normalized texts and bracket flags of the detected placeholders, computed once
+                match_keys = self._get_placeholder_match_keys()
                 
                 # Process each placeholder text group
-                for placeholder_text, field_entries in placeholder_groups.items():
+                for placeholder_text, field_entries in field_based.items():
                     # Normalize placeholder text for matching (handle whitespace variations)
-                    def normalize_for_matching(text):
-                        """Normalize text by extracting base label name"""
-                        if ':' in text:
-                            # Label field: extract label name before colon
-                            return text.split(':')[0].strip().lower()
-                        return text.strip().lower()
-                    
-                    normalized_search = normalize_for_matching(placeholder_text)
+                    normalized_search = _normalize_for_matching(placeholder_text)
                     
                     # Find all occurrences that match (normalize both sides for comparison)
                     # IMPORTANT: Only match placeholders that START with the label (not composite ones)
@@ -211,8 +387,7 @@ class DocumentProcessor:
                         # Label field: check for composite placeholders
                         search_label = placeholder_text.split(':')[0].strip().lower()
                         
-                        for p in self.placeholders:
-                            normalized_p = normalize_for_matching(p.text)
+                        for p, (normalized_p, _, _) in zip(self.placeholders, match_keys):
                             # Match if normalized labels are equal
                             if normalized_p == normalized_search:
                                 # Check that the placeholder text starts with the label (after whitespace)
@@ -224,43 +399,28 @@ class DocumentProcessor:
                                     after_first_label = p_text_stripped[len(search_label) + 1:].strip()
                                     # If there's content after the colon, check if it contains another label pattern
                                     # (word followed by colon)
-                                    import re
                                     # Check if there's another label pattern (word: or word : or word:\n)
-                                    has_another_label = bool(re.search(r'\b\w+\s*:', after_first_label, re.IGNORECASE))
+                                    has_another_label = _contains_label(after_first_label)
                                     if not has_another_label:
                                         # This is a pure label field, not a composite
                                         matching_placeholders.append(p)
                     else:
                         # Explicit placeholder (like [_____________]): match with bracket variations
                         # But be precise - if placeholder_text has brackets, only match ones with brackets
-                        placeholder_has_brackets = (
-                            placeholder_text.startswith('[') and placeholder_text.endswith(']') or
-                            placeholder_text.startswith('{') and placeholder_text.endswith('}') or
-                            placeholder_text.startswith('(') and placeholder_text.endswith(')')
-                        )
+                        placeholder_has_brackets = _has_brackets(placeholder_text)
+                        placeholder_content = placeholder_text.strip('[]{}()').strip().lower()
                         
-                        for p in self.placeholders:
-                            p_has_brackets = (
-                                p.text.startswith('[') and p.text.endswith(']') or
-                                p.text.startswith('{') and p.text.endswith('}') or
-                                p.text.startswith('(') and p.text.endswith(')')
-                            )
-                            
+                        for p, (p_normalized, p_has_brackets, p_content) in zip(self.placeholders, match_keys):
                             # Match if both have brackets or both don't have brackets
                             if placeholder_has_brackets == p_has_brackets:
                                 # For explicit placeholders, match exactly (normalize whitespace)
-                                p_normalized = normalize_for_matching(p.text)
-                                placeholder_normalized = normalize_for_matching(placeholder_text)
-                                
                                 # Match if normalized text is equal
-                                if p_normalized == placeholder_normalized:
+                                if p_normalized == normalized_search:
                                     matching_placeholders.append(p)
                                 # Also match if brackets are the same but content matches
                                 elif placeholder_has_brackets and p_has_brackets:
                                     # Both have brackets, check if content matches
-                                    p_content = p.text.strip('[]{}()').strip()
-                                    placeholder_content = placeholder_text.strip('[]{}()').strip()
-                                    if p_content.lower() == placeholder_content.lower():
+                                    if p_content == placeholder_content:
                                         matching_placeholders.append(p)
                     
                     if not matching_placeholders:
@@ -270,29 +430,22 @@ class DocumentProcessor:
                         continue
                     
                     # For each field entry, find the best matching occurrence
-                    matched_indices = []  # Track which indices we've matched
+                    matched_indices = set()  # Track which indices we've matched
                     replacements_to_do = []  # Collect all replacements to do
                     
                     for field_name, value, key in field_entries:
                         # Extract keywords from field_name
-                        field_keywords = field_name.replace('_', ' ').lower().split()
+                        field_phrase = field_name.replace('_', ' ').lower()
+                        field_keywords = field_phrase.split()
                         
-                        # Common field name to label mappings
-                        field_label_mappings = {
-                            'purchase_amount': ['purchase amount', 'the purchase amount'],
-                            'post_money_valuation_cap': ['post-money valuation cap', 'post money valuation cap', 'valuation cap'],
-                            'pre_money_valuation_cap': ['pre-money valuation cap', 'pre money valuation cap'],
-                            'discount_rate': ['discount rate', 'discount'],
-                            'conversion_price': ['conversion price', 'safe price'],
-                        }
-                        
-                        # Get potential labels for this field
-                        potential_labels = field_label_mappings.get(field_name, [])
-                        potential_labels.append(field_name.replace('_', ' '))  # Add field_name itself
+                        # Get potential labels for this field (lowercased), plus field_name itself
+                        potential_labels = _FIELD_LABEL_MAPPINGS.get(field_name, ()) + (field_phrase,)
                         
                         # Find the best matching occurrence by checking context
                         best_match_idx = None
                         best_score = 0
+                        # Highest score an occurrence can get: every label and keyword in context
+                        max_score = 20 * len(potential_labels) + 2 * len(field_keywords)
                         
                         for idx, ph in enumerate(matching_placeholders):
                             # Skip if this index was already matched
@@ -302,24 +455,27 @@ class DocumentProcessor:
                             # Extract context around this occurrence (100 chars before and after)
                             context_start = max(0, ph.position - 100)
                             context_end = min(len(self.full_text), ph.end_position + 100)
-                            context = self.full_text[context_start:context_end].lower()
                             
                             score = 0
                             
                             # High score if any potential label appears in context
                             for label in potential_labels:
-                                if label.lower() in context:
+                                if self._term_in_context(label, context_start, context_end):
                                     score += 20  # Strong match
                             
                             # Medium score for individual keywords
-                            score += sum(2 for keyword in field_keywords if keyword in context)
+                            score += sum(2 for keyword in field_keywords
+                                         if self._term_in_context(keyword, context_start, context_end))
                             
                             if score > best_score:
                                 best_score = score
                                 best_match_idx = idx
+                                # No later occurrence can score higher, so the first one wins
+                                if score == max_score:
+                                    break
                         
                         if best_match_idx is not None:
-                            matched_indices.append(best_match_idx)
+                            matched_indices.add(best_match_idx)
                             # Get the actual placeholder text from the detected placeholder
                             # IMPORTANT: Use the actual text as-is, don't normalize whitespace
                             # The replacement function will extract the pattern from the document
@@ -342,44 +498,30 @@ class DocumentProcessor:
                             if VERBOSE_LOGGING:
                                 print(f"  ✗ Failed: {key} (could not match field_name '{field_name}' to any occurrence)")
                     
-                    # Now replace all matches in reverse order (last occurrence first)
-                    # Sort by original index descending
+                    # Replace each match at the offset where that occurrence was detected. Going
+                    # last to first keeps the offsets of the remaining matches in a paragraph valid
                     replacements_to_do.sort(key=lambda x: x[0], reverse=True)
                     
-                    replacements_done = 0
                     for original_idx, replacement_pattern, value, key, actual_text in replacements_to_do:
-                        # Calculate reverse index correctly
-                        # We're processing in reverse order (last occurrence first)
-                        # After each replacement, the handler re-searches and finds fewer occurrences
-                        # So we always want the LAST remaining occurrence = index (remaining_count - 1)
-                        remaining_count = len(matching_placeholders) - replacements_done
-                        reverse_idx = remaining_count - 1
-                        
-                        # Safety check: ensure reverse_idx is valid
-                        if reverse_idx < 0:
-                            if VERBOSE_LOGGING:
-                                print(f"  ✗ Failed: {key} (invalid reverse_idx: {reverse_idx}, remaining_count: {remaining_count}, replacements_done: {replacements_done})")
-                            continue
+                        # Point at the placeholder itself, past any leading whitespace of a blank field line
+                        offset = matching_placeholders[original_idx].position + len(actual_text) - len(actual_text.lstrip())
                         
                         # Use the base label pattern for replacement (pattern matching handles whitespace)
-                        # The handler will extract the actual pattern from the document
-                        success = self.doc_handler.replace_placeholder_at_position(replacement_pattern, value, reverse_idx)
+                        success = self.doc_handler.replace_placeholder_at_offset(replacement_pattern, value, offset)
                         if success:
                             total_replacements += 1
-                            replacements_done += 1
                             if VERBOSE_LOGGING:
-                                print(f"  ✓ Replaced: {key:40} → {value[:25]} (matched occurrence {original_idx + 1}/{len(matching_placeholders)}, reverse_idx={reverse_idx})")
+                                print(f"  ✓ Replaced: {key:40} → {value[:25]} (matched occurrence {original_idx + 1}/{len(matching_placeholders)})")
                         else:
                             # Fallback: try with normalized text
-                            success = self.doc_handler.replace_placeholder_at_position(placeholder_text, value, reverse_idx)
+                            success = self.doc_handler.replace_placeholder_at_offset(placeholder_text, value, offset)
                             if success:
                                 total_replacements += 1
-                                replacements_done += 1
                                 if VERBOSE_LOGGING:
-                                    print(f"  ✓ Replaced: {key:40} → {value[:25]} (matched occurrence {original_idx + 1}/{len(matching_placeholders)}, fallback, reverse_idx={reverse_idx})")
+                                    print(f"  ✓ Replaced: {key:40} → {value[:25]} (matched occurrence {original_idx + 1}/{len(matching_placeholders)}, fallback)")
                             else:
                                 if VERBOSE_LOGGING:
-                                    print(f"  ✗ Failed: {key} (replacement failed - tried '{replacement_pattern}' and '{placeholder_text}', reverse_idx={reverse_idx}, remaining_count={remaining_count})")
+                                    print(f"  ✗ Failed: {key} (replacement failed - tried '{replacement_pattern}' and '{placeholder_text}' at offset {offset})")
                 
                 if VERBOSE_LOGGING:
                     print()
@@ -389,19 +531,31 @@ class DocumentProcessor:
             if placeholder_keys:
                 if VERBOSE_LOGGING:
                     print(f"✓ Using {len(placeholder_keys)} placeholder-based replacements\n")
+                
+                # Explicit placeholders are all matched in a single scan of the document
+                explicit_keys = {text: value for text, value in placeholder_keys.items()
+                                 if self.doc_handler.is_explicit_placeholder(text)}
+                explicit_counts = self.doc_handler.replace_placeholders(explicit_keys) if explicit_keys else {}
+                
                 for placeholder_text, value in placeholder_keys.items():
                     # Count how many times this placeholder appears
-                    occurrences_count = sum(1 for p in self.placeholders if p.text == placeholder_text)
+                    occurrences_count = placeholder_counts.get(placeholder_text, 0)
                     
-                    if occurrences_count > 1:
-                        # Replace all occurrences one by one
-                        # IMPORTANT: Replace in reverse order (last to first) to avoid position shifts
-                        replaced_this_placeholder = 0
-                        for i in range(occurrences_count - 1, -1, -1):  # Reverse order: last occurrence first
-                            success = self.doc_handler.replace_placeholder_at_position(placeholder_text, value, i)
-                            if success:
-                                replaced_this_placeholder += 1
-                                total_replacements += 1
+                    if placeholder_text in explicit_keys:
+                        replaced_this_placeholder = explicit_counts.get(placeholder_text, 0)
+                        total_replacements += replaced_this_placeholder
+                        
+                        if VERBOSE_LOGGING:
+                            if replaced_this_placeholder > 0:
+                                print(f"  ✓ Replaced: {placeholder_text:40} → {value[:25]} ({replaced_this_placeholder}/{occurrences_count} occurrences)")
+                            elif occurrences_count:
+                                print(f"  ✗ Failed:   {placeholder_text} (0/{occurrences_count} occurrences)")
+                            else:
+                                print(f"  ✗ Failed:   {placeholder_text} (not found in document)")
+                    elif occurrences_count > 1:
+                        # Replace all occurrences in one pass over the document
+                        replaced_this_placeholder = self.doc_handler.replace_placeholder_all(placeholder_text, value)
+                        total_replacements += replaced_this_placeholder
                         
                         if replaced_this_placeholder > 0:
                             if VERBOSE_LOGGING:
@@ -410,7 +564,7 @@ class DocumentProcessor:
                             if VERBOSE_LOGGING:
                                 print(f"  ✗ Failed:   {placeholder_text} (0/{occurrences_count} occurrences)")
                     else:
-                        # Single occurrence, use regular replacement
+                        # Single label field, use regular replacement
                         success = self.doc_handler.replace_placeholder(placeholder_text, value)
                         if success:
                             total_replacements += 1
@@ -418,10 +572,9 @@ class DocumentProcessor:
                                 print(f"  ✓ Replaced: {placeholder_text:40} → {value[:25]}")
                         else:
                             # Debug: check if placeholder exists
-                            matching_placeholders = [p for p in self.placeholders if p.text == placeholder_text]
                             if VERBOSE_LOGGING:
-                                if matching_placeholders:
-                                    print(f"  ✗ Failed:   {placeholder_text} (found {len(matching_placeholders)} occurrences but replacement failed)")
+                                if occurrences_count:
+                                    print(f"  ✗ Failed:   {placeholder_text} (found {occurrences_count} occurrences but replacement failed)")
                                 else:
                                     print(f"  ✗ Failed:   {placeholder_text} (not found in document)")
                 
@@ -439,23 +592,17 @@ class DocumentProcessor:
             if not output_dir:
                 # Default: use temp directory for production, or project output folder for development
                 if os.getenv('ENVIRONMENT', 'production') == 'development':
-                    current_dir = os.path.dirname(os.path.abspath(__file__))
-                    project_root = os.path.dirname(current_dir)
-                    output_dir = os.path.join(project_root, "output")
+                    output_dir = _PROJECT_OUTPUT_DIR
                 else:
-                    import tempfile
                     output_dir = tempfile.gettempdir()
             
-            # Create output directory if it doesn't exist
+            # Create output directory if it doesn't exist (checked on every save, as it may
+            # have been removed since the last one)
             os.makedirs(output_dir, exist_ok=True)
             
-            # Generate output filename based on input filename
-            input_filename = os.path.basename(self.doc_path)
-            name_without_ext = os.path.splitext(input_filename)[0]
-            output_filename = f"{name_without_ext}_filled.docx"
-            output_path = os.path.join(output_dir, output_filename)
+            output_path = os.path.join(output_dir, self._output_filename)
             
-            if self.doc_handler.save_document(output_path):
+            if self.doc_handler.save_document_fast(output_path):
                 return True, output_path
             else:
                 if VERBOSE_LOGGING:
@@ -481,11 +628,10 @@ class DocumentProcessor:
             Tuple of (success: bool, output_path: str)
         """
         try:
-            # Convert placeholder names to full text
-            replacements = {}
-            for placeholder in self.placeholders:
-                if placeholder.name in values:
-                    replacements[placeholder.text] = values[placeholder.name]
+            # Convert placeholder names to full text, looking up only the given names
+            name_to_texts = self._get_name_to_texts()
+            replacements = {text: value for name, value in values.items()
+                            for text in name_to_texts.get(name, ())}
             
             return self.fill_placeholders(replacements)
         
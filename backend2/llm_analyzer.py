@@ -1,13 +1,325 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
+import re
 import sys
-from typing import List, Dict, Optional
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 from dataclasses import dataclass
 
+try:
+    import orjson  # Optional: faster parsing of large LLM responses
+except ImportError:
+    orjson = None
 
-@dataclass
+# Load .env once per process, before any of the settings below are read
+load_dotenv()
+
+# OpenRouter API key from the environment / .env
+OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
+
+# Progress and diagnostic output is only printed when VERBOSE_LOGGING=true (errors are always printed)
+VERBOSE_LOGGING = os.getenv('VERBOSE_LOGGING', 'false').lower() == 'true'
+
+# Maximum number of requests sent to OpenRouter at the same time
+MAX_CONCURRENT_REQUESTS = max(1, int(os.getenv('LLM_MAX_CONCURRENT_REQUESTS', '4')))
+
+# Caps OpenRouter calls in flight across the whole process (chunk threads, batch analysis
+# and concurrent API requests together), to stay within the provider's rate limits
+_REQUEST_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+# Optional per-minute budgets for OpenRouter (OPENROUTER_RPM requests, OPENROUTER_TPM tokens;
+# unset or 0 means unlimited). Calls wait for budget before they are sent instead of running
+# into 429 responses and retry backoff
+OPENROUTER_RPM = int(os.getenv('OPENROUTER_RPM', '0'))
+OPENROUTER_TPM = int(os.getenv('OPENROUTER_TPM', '0'))
+
+# Longest reply requested from the model; also counted against OPENROUTER_TPM for each call
+MAX_RESPONSE_TOKENS = 4000
+
+
+class _TokenBucket:
+    """Thread-safe token bucket holding up to per_minute units, refilled continuously"""
+    
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.available = float(per_minute)
+        self.refill_per_second = per_minute / 60.0
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, amount: int = 1):
+        """Block until amount units are available, then take them (amounts above capacity take a full bucket)"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated_at) * self.refill_per_second)
+                self.updated_at = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                wait = (amount - self.available) / self.refill_per_second
+            time.sleep(wait)
+
+
+_REQUEST_BUCKET = _TokenBucket(OPENROUTER_RPM) if OPENROUTER_RPM > 0 else None
+_TOKEN_BUCKET = _TokenBucket(OPENROUTER_TPM) if OPENROUTER_TPM > 0 else None
+
+# HTTP session shared by all analyzers, so connections (and TLS sessions) to OpenRouter are
+# kept alive and reused across calls, chunk threads and API requests. The completion POST is not
+# idempotent, so only responses that mean it was not run (429 rate limited, 503 unavailable) and
+# failed connections are retried, with exponential backoff honoring Retry-After; 500/502/504 and
+# read errors are not, as the upstream may already have run (and billed) the completion
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.headers.update({
+    "HTTP-Referer": "https://github.com/anishgillella/lexsy-document-ai",
+    "X-Title": "Lexsy Document AI",
+})
+_HTTP_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=max(10, MAX_CONCURRENT_REQUESTS),
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # The last response is returned and raise_for_status() reports it
+    ),
+))
+
+# Persistent cache of LLM responses, keyed by model and prompt. Off unless LLM_CACHE_ENABLED=true:
+# responses hold names, addresses and terms from the analyzed documents and are stored unencrypted
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'false').lower() == 'true'
+LLM_CACHE_DIR = os.getenv('LLM_CACHE_DIR') or os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'lexsy')
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH') or os.path.join(LLM_CACHE_DIR, 'llm_cache.sqlite3')
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(30 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1000'))
+
+# Most recently used responses, also kept in memory: cache key -> (response, expires)
+MEMORY_CACHE_SIZE = 128
+_MEMORY_CACHE = OrderedDict()
+_MEMORY_CACHE_LOCK = threading.Lock()
+
+# Documents up to this many characters are sent whole for placeholder analysis; larger ones
+# are sent as an outline (first OUTLINE_CHARS characters and section headings) plus the text
+# within EXCERPT_MARGIN characters of each placeholder context
+FULL_DOCUMENT_PROMPT_LIMIT = 12000
+OUTLINE_CHARS = 500
+EXCERPT_MARGIN = 300
+
+# Text that could hold a field of one of the kinds the detection prompt lists: bracketed or
+# braced text, parenthesized text other than list markers like "(a)" or "(iv)", underscore blanks,
+# and labels followed by a blank ("Name:" at the end of a line or before a run of spaces)
+_FIELD_CANDIDATE_RE = re.compile(
+    r'\[[^\]\n]{1,80}\]|\{[^}\n]{1,80}\}|\((?![ivxlc]{1,4}\)|[a-zA-Z0-9]\))[^)\n]{1,80}\)|_{3,}'
+    r'|\w[ \t]*:[ \t]*$|\w[ \t]*:[ \t]{2,}',
+    re.MULTILINE
+)
+
+# "Label:" lines with nothing after them - blanks that only the LLM can name
+_BLANK_LABEL_RE = re.compile(r'^[ \t]*[A-Za-z][\w \t]{0,40}:[ \t]*$', re.MULTILINE)
+
+# Section heading lines: numbered ("1.", "2.3", "IV."), "Section 4"/"Article II", or all caps
+_SECTION_HEADING_RE = re.compile(
+    r'^[ \t]*(?:(?:\d+(?:\.\d+)*\.?|[IVX]+\.|(?:Section|SECTION|Article|ARTICLE)\s+\w+)[ \t]+[^\n]{1,80}'
+    r'|[A-Z][A-Z0-9 ,&\'-]{3,80})[ \t]*$',
+    re.MULTILINE
+)
+
+# Field detection sends a document whole when it fits in the model's context window
+# (LLM_CONTEXT_TOKENS), and otherwise splits it into pages of that size. Sized at ~3 characters
+# per token, leaving room for the instructions and the reply
+LLM_CONTEXT_TOKENS = int(os.getenv('LLM_CONTEXT_TOKENS', '32000'))
+PROMPT_OVERHEAD_TOKENS = 1500
+CONTEXT_CHARS = max(1000, (LLM_CONTEXT_TOKENS - MAX_RESPONSE_TOKENS - PROMPT_OVERHEAD_TOKENS) * 3)
+
+# Maximum total chunk text, and number of chunks, packed into a single field detection request.
+# Past 3-4 chunks per call, the longer generation costs more latency than the saved round-trips
+MAX_BATCH_CHARS = min(30000, CONTEXT_CHARS)
+MAX_CHUNKS_PER_BATCH = 4
+
+# Field detection prompts keep only the lines within COMPACT_WINDOW_LINES of placeholder-like
+# text, when that cuts the chunk to at most COMPACT_MAX_RATIO of its length (recitals and
+# definitions with no blanks in them are just tokens to the LLM)
+COMPACT_WINDOW_LINES = 3
+COMPACT_MAX_RATIO = 0.3
+
+# Field detection instructions shared by the single-chunk and batched prompts
+_FIELD_DETECTION_INSTRUCTIONS = """IDENTIFY ALL PLACEHOLDER TYPES:
+
+Explicit placeholders (replace entire placeholder):
+- [field name] - Square brackets
+- {field name} - Curly braces  
+- (field name) - Parentheses
+- _____  - Underscores
+
+Blank fields (keep label, replace blank part):
+- "Label: _____" - Label with underscores
+- "Label:        " - Label with spaces
+- "Label: " - Label with blank
+- "Name:" - Just colon (blank to fill)
+- "By:" - Signature fields with colon
+- "By:        " - Signature fields with spaces after colon
+- "Name:   " - Name fields with spaces
+- Any label ending with ":" followed by spaces/underscores/blank
+
+For EACH valid field you identify:
+1. Field name (e.g., "investor_name", "company_address")
+2. The EXACT placeholder text AS IT APPEARS (e.g., "[Company Name]", "Address: ", "$[_____________]")
+3. Data type (email, address, string, date, currency, phone, number, url)
+4. Natural question to ask user
+5. Example value
+6. Mark as NOT required
+"""
+
+# Instructions for placeholder analysis. They are sent as a separate system message ahead of
+# the document, so the unchanging prefix can be served from the provider's prompt cache
+_PLACEHOLDER_ANALYSIS_INSTRUCTIONS = """Analyze this document and the placeholders detected by regex. Identify which placeholders are ACTUAL FIELDS that need to be filled in by the user, versus legal text or definitions that should NOT be filled.
+
+CRITICAL INSTRUCTIONS:
+1. Review the FULL document context AND the surrounding context for EACH placeholder occurrence listed in the user message
+2. Identify which placeholders are ACTUAL FIELDS that need user input:
+   - Short bracketed placeholders (1-3 words): "[Company Name]", "[COMPANY]", "[Investor Name]", "[name]", "[title]", "[Date of Safe]"
+   - Underscore placeholders like "[_____________]" - these are actual fields that need values
+   - Label fields like "Address: ", "Email: ", "Name: ", "By:"
+   - Signature section fields (even if similar to header fields)
+   - DO NOT include long legal text in brackets/parentheses (even if detected by regex)
+3. IGNORE placeholders that are:
+   - Legal definitions or explanations in parentheses like "(a) Equity Financing..."
+   - Section references like "(i)", "(ii)", "(iii)" when they're just list markers
+   - Legal citations like "(within the meaning of Section 13(d)...)"
+   - Long legal text blocks in parentheses
+4. IMPORTANT: Include ALL signature section placeholders:
+   - "[COMPANY]" is different from "[Company Name]" - include both
+   - "[name]" in company section vs investor section - include both separately
+   - "By:", "Name:", "Title:", "Address:", "Email:" in signature sections
+5. ABSOLUTELY CRITICAL: For placeholders with IDENTICAL TEXT but DIFFERENT CONTEXT:
+   - You MUST examine EACH occurrence's context separately
+   - If the same placeholder text appears with DIFFERENT surrounding context → treat as SEPARATE FIELDS
+   - Example: If "[_____________]" appears multiple times:
+     * Occurrence 1 near "Purchase Amount" or "$" → field_name: "purchase_amount"
+     * Occurrence 2 near "Post-Money Valuation Cap" or "Valuation Cap" → field_name: "post_money_valuation_cap"
+     * Occurrence 3 near "Pre-Money Valuation Cap" → field_name: "pre_money_valuation_cap"
+   - Look at the surrounding text (100 chars before/after) to understand what each occurrence represents
+   - Return ONE entry per occurrence with different context, even if placeholder text is identical
+   - DO NOT group them together - each unique context needs its own field entry
+6. For placeholders with IDENTICAL TEXT and SAME CONTEXT:
+   - Normalize whitespace: "Address: " and "Address:\n" are the SAME field → return ONE entry
+   - If the same placeholder appears multiple times with the SAME meaning → group as ONE field
+7. Provide context-based descriptions to distinguish similar placeholders
+8. When returning placeholder_text, use the CLEANEST version (e.g., "Address: " not "Address:\n                        ")
+9. MANDATORY: You MUST return an entry for EVERY occurrence of actual form fields, even if they have the same placeholder text. Count how many times each placeholder appears in that list and ensure you return that many entries (if they have different contexts).
+
+Return ONLY actual fields that need filling, as JSON array. For identical placeholder texts with different contexts, return separate entries:
+[
+  {
+    "field_name": "company_name",
+    "placeholder_text": "[Company Name]",
+    "data_type": "string",
+    "description": "The name of the company issuing the SAFE",
+    "suggested_question": "What is the company name?",
+    "example": "Acme Corp",
+    "required": false
+  },
+  {
+    "field_name": "purchase_amount",
+    "placeholder_text": "[_____________]",
+    "data_type": "number",
+    "description": "The amount paid by the investor (Purchase Amount)",
+    "suggested_question": "What is the purchase amount?",
+    "example": "100000",
+    "required": false
+  },
+  {
+    "field_name": "post_money_valuation_cap",
+    "placeholder_text": "[_____________]",
+    "data_type": "number",
+    "description": "The post-money valuation cap amount",
+    "suggested_question": "What is the post-money valuation cap?",
+    "example": "5000000",
+    "required": false
+  }
+]
+
+ONLY return placeholders that are actual form fields, NOT legal text or definitions."""
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize to UTF-8 JSON with orjson when it is installed, falling back to the json module"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def _json_loads(json_str):
+    """Parse JSON (str or bytes) with orjson when it is installed, falling back to the json module"""
+    if orjson is not None:
+        try:
+            return orjson.loads(json_str)
+        except orjson.JSONDecodeError:
+            pass  # json.loads accepts a few inputs orjson rejects (e.g. NaN, huge integers)
+    return json.loads(json_str)
+
+
+def _extract_json(response: str, open_char: str, close_char: str):
+    """
+    Extract the JSON array ('[', ']') or object ('{', '}') from an LLM response, which may wrap
+    it in prose or code fences.
+    
+    The span from the first open_char to the last close_char is tried first. If that is not valid
+    JSON (e.g. a bracketed word in the prose before it), each open_char is tried in turn with
+    JSONDecoder.raw_decode, which parses one value and ignores whatever follows.
+    
+    Raises ValueError if no JSON value can be parsed.
+    """
+    start = response.find(open_char)
+    end = response.rfind(close_char)
+    if start == -1 or end < start:
+        return _json_loads(response)
+    
+    try:
+        return _json_loads(response[start:end + 1])
+    except ValueError as e:
+        error = e
+    
+    decoder = json.JSONDecoder()
+    while start != -1:
+        try:
+            return decoder.raw_decode(response, start)[0]
+        except ValueError:
+            start = response.find(open_char, start + 1)
+    raise error
+
+
+@lru_cache(maxsize=4096)
+def _normalize_placeholder(text: str) -> str:
+    """Normalize placeholder text for comparison (remove extra whitespace)"""
+    # Remove leading/trailing whitespace and normalize internal whitespace
+    # Replace all whitespace (spaces, tabs, newlines) with single space
+    normalized = ' '.join(text.strip().split())
+    # For label fields, normalize to "Label:"
+    if ':' in normalized:
+        label_part = normalized.split(':')[0].strip()
+        return label_part + ':'
+    return normalized
+
+
+# slots=True needs Python 3.10+, the documented minimum
+@dataclass(slots=True, frozen=True)
 class PlaceholderAnalysis:
     """Analysis result for a placeholder"""
     placeholder_text: str
@@ -20,6 +332,31 @@ class PlaceholderAnalysis:
     validation_hint: Optional[str]  # Hint for validation (e.g., "Must be valid email")
 
 
+def analyses_from_regex(placeholders_data: List[Dict]) -> List[PlaceholderAnalysis]:
+    """
+    Build basic analyses straight from regex-detected placeholders, without the LLM
+    
+    Args:
+        placeholders_data: Placeholder dicts with 'text' and 'name' (as returned by DocumentProcessor.process())
+    
+    Returns:
+        One PlaceholderAnalysis per placeholder
+    """
+    return [
+        PlaceholderAnalysis(
+            placeholder_text=ph['text'],
+            placeholder_name=ph['name'],
+            data_type='string',
+            description=f"Field: {ph['name']}",
+            suggested_question=f"What is the {ph['name'].lower().replace('_', ' ')}?",
+            example="",
+            required=False,
+            validation_hint=None
+        )
+        for ph in placeholders_data
+    ]
+
+
 class LLMAnalyzer:
     
     def __init__(self, api_key: Optional[str] = None):
@@ -29,8 +366,7 @@ class LLMAnalyzer:
         Args:
             api_key: OpenRouter API key. If not provided, will use OPENROUTER_API_KEY from .env
         """
-        load_dotenv()
-        self.api_key = api_key or os.getenv('OPENROUTER_API_KEY')
+        self.api_key = api_key or OPENROUTER_API_KEY
         self.model = "qwen/qwen2.5-vl-72b-instruct"
         self.base_url = "https://openrouter.ai/api/v1"
         
@@ -65,7 +401,7 @@ class LLMAnalyzer:
         # Extract context around each placeholder occurrence (100 chars before and after for better context)
         placeholder_contexts = []
         for text, occurrences in placeholder_groups.items():
-            for occ in occurrences:
+            for occurrence_index, occ in enumerate(occurrences):
                 pos = occ.get('position', 0)
                 end_pos = occ.get('end_position', pos + len(text))
                 
@@ -79,77 +415,316 @@ class LLMAnalyzer:
                     'name': occ.get('name', ''),
                     'position': pos,
                     'context': context,
-                    'occurrence_index': placeholder_groups[text].index(occ)
+                    'occurrence_index': occurrence_index
                 })
         
         # Send to LLM for analysis with context
         return self._analyze_placeholders_with_llm(document_text, placeholder_contexts)
     
-    def detect_all_fields(self, document_text: str) -> List[PlaceholderAnalysis]:
+    def analyze_placeholders_batch(self, documents: List[Tuple[str, List[Dict]]]) -> List[List[PlaceholderAnalysis]]:
+        """
+        Analyze the placeholders of several documents, for bulk processing.
+        
+        Args:
+            documents: List of (document_text, regex_placeholders) tuples, as passed to
+                       analyze_placeholders_with_context
+        
+        Returns:
+            List of PlaceholderAnalysis lists, one per document, in input order
+        """
+        if not documents:
+            return []
+        
+        # Documents are analyzed concurrently, MAX_CONCURRENT_REQUESTS at a time
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_REQUESTS, len(documents)))) as executor:
+            return list(executor.map(lambda doc: self.analyze_placeholders_with_context(*doc), documents))
+    
+    def detect_all_fields(self, document_text: str, force: bool = False,
+                          regex_placeholders: Optional[List[Dict]] = None) -> List[PlaceholderAnalysis]:
         """
         Legacy method - kept for backward compatibility.
         Use analyze_placeholders_with_context instead.
+        
+        Args:
+            document_text: The full document text
+            force: Send text to the LLM even where no placeholder-like pattern is found,
+                   or where the regex placeholders alone would do
+            regex_placeholders: Optional placeholders already found by regex detection
         """
         if len(document_text.strip()) < 100:
             return []
         
+        if not force and self._can_skip_llm(document_text, regex_placeholders):
+            if VERBOSE_LOGGING:
+                print(f"📄 Only explicit placeholders found ({len(regex_placeholders)}) - skipping LLM field detection")
+            return analyses_from_regex(regex_placeholders)
+        
+        if not force and not _FIELD_CANDIDATE_RE.search(document_text):
+            if VERBOSE_LOGGING:
+                print("📄 No placeholder-like text found - skipping LLM field detection")
+            return []
+        
         doc_length = len(document_text)
         
         # Strategy based on document size
-        if doc_length < 10000:
+        if doc_length < CONTEXT_CHARS:
             # Small document: send entire thing
-            print(f"📄 Document size: {doc_length} chars (small) - sending entire document")
+            if VERBOSE_LOGGING:
+                print(f"📄 Document size: {doc_length} chars (small) - sending entire document")
+            if not force:
+                document_text = self._compact_chunk(document_text)
             return self._detect_fields_in_chunk(document_text, "Full Document")
         else:
             # Large document: split into intelligent chunks
-            print(f"📄 Document size: {doc_length} chars (large) - using intelligent chunking")
-            return self._detect_fields_with_chunking(document_text)
+            if VERBOSE_LOGGING:
+                print(f"📄 Document size: {doc_length} chars (large) - using intelligent chunking")
+            return self._detect_fields_with_chunking(document_text, force)
+    
+    def _can_skip_llm(self, document_text: str, regex_placeholders: Optional[List[Dict]]) -> bool:
+        """
+        Whether the regex placeholders cover the document on their own: there is at least one,
+        and no bare "Label:" lines that would need the LLM to turn into fields.
+        """
+        return bool(regex_placeholders) and not _BLANK_LABEL_RE.search(document_text)
+    
+    def detect_all_fields_batch(self, documents: List[str], force: bool = False) -> List[List[PlaceholderAnalysis]]:
+        """
+        Detect fields in several documents, for bulk processing.
+        
+        Chunks from all documents are packed into shared requests, so a set of small templates
+        costs a few calls rather than one per document.
+        
+        Args:
+            documents: List of document texts, as passed to detect_all_fields
+            force: Send text to the LLM even where no placeholder-like pattern is found
+        
+        Returns:
+            List of PlaceholderAnalysis lists, one per document, in input order
+        """
+        chunk_owners = []
+        
+        def tagged_chunks():
+            for doc_index, document_text in enumerate(documents):
+                for chunk_name, chunk_text in self._document_chunks(document_text, force):
+                    chunk_owners.append(doc_index)
+                    yield (f"Document {doc_index + 1} - {chunk_name}", chunk_text)
+        
+        batches = self._group_chunks(tagged_chunks())
+        if VERBOSE_LOGGING:
+            print(f"📑 Split {len(documents)} documents into {len(chunk_owners)} chunks ({len(batches)} requests) for analysis")
+        
+        chunk_results_by_doc = [[] for _ in documents]
+        for doc_index, chunk_fields in zip(chunk_owners, self._analyze_batches(batches)):
+            chunk_results_by_doc[doc_index].append(chunk_fields)
+        
+        return [self._merge_chunk_fields(chunk_results) for chunk_results in chunk_results_by_doc]
+    
+    def _document_chunks(self, document_text: str, force: bool = False) -> Iterator[Tuple[str, str]]:
+        """Chunks of one document to send for field detection, following the same rules as detect_all_fields"""
+        if len(document_text.strip()) < 100:
+            return
+        if not force and not _FIELD_CANDIDATE_RE.search(document_text):
+            return
+        
+        if len(document_text) < CONTEXT_CHARS:
+            yield ("Full Document", document_text if force else self._compact_chunk(document_text))
+        else:
+            yield from self._candidate_chunks(document_text, force)
+    
+    def _detect_fields_with_chunking(self, document_text: str, force: bool = False) -> List[PlaceholderAnalysis]:
+        """Split large document intelligently and detect fields from all chunks (only chunks with placeholder-like text unless force)."""
+        # Several chunks are packed into each request to avoid repeating the instructions.
+        # Chunks are produced lazily and go straight into their batches
+        batches = self._group_chunks(self._candidate_chunks(document_text, force))
+        if VERBOSE_LOGGING:
+            print(f"📑 Split document into {sum(len(batch) for batch in batches)} chunks ({len(batches)} requests) for analysis")
+        
+        all_fields = self._merge_chunk_fields(self._analyze_batches(batches))
+        
+        if VERBOSE_LOGGING:
+            print(f"✓ Total unique fields detected: {len(all_fields)}")
+        return all_fields
     
-    def _detect_fields_with_chunking(self, document_text: str) -> List[PlaceholderAnalysis]:
-        """Split large document intelligently and detect fields from all chunks."""
+    def _candidate_chunks(self, document_text: str, force: bool = False) -> Iterator[Tuple[str, str]]:
+        """
+        Split a document into chunks, dropping (unless force) chunks without any placeholder-like
+        text and compacting the rest, then skipping repeated chunks.
+        """
         chunks = self._split_document_intelligent(document_text)
-        print(f"📑 Split document into {len(chunks)} chunks for analysis")
+        if not force:
+            chunks = (
+                (chunk_name, self._compact_chunk(chunk_text))
+                for chunk_name, chunk_text in chunks
+                if _FIELD_CANDIDATE_RE.search(chunk_text)
+            )
+        return self._unique_chunks(chunks)
+    
+    def _analyze_batches(self, batches: List[List[tuple]]) -> List[List[PlaceholderAnalysis]]:
+        """Analyze batches of chunks and return the detected fields of each chunk, in chunk order"""
+        # Batches are analyzed concurrently (the calls are network-bound); results come
+        # back in chunk order, so the first chunk that names a field still wins
+        def analyze_batch(numbered_batch):
+            i, batch = numbered_batch
+            if VERBOSE_LOGGING:
+                print(f"  Analyzing batch {i}/{len(batches)}: {', '.join(name for name, _ in batch)}")
+            return self._detect_fields_in_chunks(batch)
+        
+        if not batches:
+            return []
         
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_REQUESTS, len(batches)))) as executor:
+            batch_results = list(executor.map(analyze_batch, enumerate(batches, 1)))
+        
+        return [fields for batch_fields in batch_results for fields in batch_fields]
+    
+    def _merge_chunk_fields(self, chunk_results: Iterable[List[PlaceholderAnalysis]]) -> List[PlaceholderAnalysis]:
+        """Combine per-chunk fields, keeping the first field seen for each field name"""
         all_fields = []
         seen_field_names = set()
         
-        for i, (chunk_name, chunk_text) in enumerate(chunks, 1):
-            print(f"  Analyzing chunk {i}/{len(chunks)}: {chunk_name}")
-            
-            chunk_fields = self._detect_fields_in_chunk(chunk_text, chunk_name)
-            
+        for chunk_fields in chunk_results:
             # Add fields, skip duplicates based on field name
             for field in chunk_fields:
                 if field.placeholder_name not in seen_field_names:
                     all_fields.append(field)
                     seen_field_names.add(field.placeholder_name)
         
-        print(f"✓ Total unique fields detected: {len(all_fields)}")
         return all_fields
     
-    def _split_document_intelligent(self, document_text: str, chunk_size: int = 8000) -> List[tuple]:
-        """Split document intelligently into pages."""
-        chunks = []
-        lines = document_text.split('\n')
-        current_page = []
+    def _compact_chunk(self, chunk_text: str) -> str:
+        """
+        Drop lines far from any placeholder-like text, marking each gap with "...".
+        
+        Returns the chunk unchanged unless the result is at most COMPACT_MAX_RATIO of its length,
+        so chunks that are mostly form fields keep their full wording.
+        """
+        lines = chunk_text.split('\n')
+        keep = [False] * len(lines)
+        for i, line in enumerate(lines):
+            if _FIELD_CANDIDATE_RE.search(line):
+                for j in range(max(0, i - COMPACT_WINDOW_LINES), min(len(lines), i + COMPACT_WINDOW_LINES + 1)):
+                    keep[j] = True
+        
+        compacted_lines = []
+        for i, line in enumerate(lines):
+            if keep[i]:
+                compacted_lines.append(line)
+            elif i == 0 or keep[i - 1]:
+                compacted_lines.append('...')
+        
+        compacted = '\n'.join(compacted_lines)
+        if len(compacted) > len(chunk_text) * COMPACT_MAX_RATIO:
+            return chunk_text
+        return compacted
+    
+    def _unique_chunks(self, chunks: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        """
+        Skip chunks whose text (ignoring whitespace differences) already appeared in an earlier
+        chunk, e.g. pages repeating the same header and footer block. Fields are deduplicated by
+        name across chunks, so a repeated chunk could only contribute fields already found.
+        """
+        seen_digests = set()
+        for chunk_name, chunk_text in chunks:
+            digest = hashlib.blake2b(' '.join(chunk_text.split()).encode('utf-8'), digest_size=16).digest()
+            if digest in seen_digests:
+                if VERBOSE_LOGGING:
+                    print(f"  ℹ Skipping {chunk_name} (same text as an earlier chunk)")
+                continue
+            seen_digests.add(digest)
+            yield (chunk_name, chunk_text)
+    
+    def _split_document_intelligent(self, document_text: str, chunk_size: int = CONTEXT_CHARS) -> Iterator[Tuple[str, str]]:
+        """Split document intelligently into pages, yielding (page_name, page_text) as each page is completed."""
+        # Walk line boundaries by offset and slice each page out of the text once
+        page_start = 0
+        line_start = 0
         current_size = 0
         page_num = 1
         
-        for line in lines:
-            line_size = len(line) + 1
-            if current_size + line_size > chunk_size and current_page:
-                chunks.append((f"Page {page_num}", '\n'.join(current_page)))
-                current_page = []
+        while True:
+            newline = document_text.find('\n', line_start)
+            line_end = len(document_text) if newline == -1 else newline
+            line_size = line_end - line_start + 1
+            if current_size + line_size > chunk_size and current_size:
+                # The page ends before the newline that precedes this line
+                yield (f"Page {page_num}", document_text[page_start:line_start - 1])
+                page_start = line_start
                 current_size = 0
                 page_num += 1
             
-            current_page.append(line)
             current_size += line_size
+            if newline == -1:
+                break
+            line_start = newline + 1
         
-        if current_page:
-            chunks.append((f"Page {page_num}", '\n'.join(current_page)))
+        yield (f"Page {page_num}", document_text[page_start:])
+    
+    def _group_chunks(self, chunks: Iterable[Tuple[str, str]], max_chars: int = MAX_BATCH_CHARS,
+                      max_chunks: int = MAX_CHUNKS_PER_BATCH) -> List[List[tuple]]:
+        """Group consecutive (chunk_name, chunk_text) chunks into batches of at most max_chunks chunks and max_chars of text"""
+        batches = []
+        current_batch = []
+        current_size = 0
+        
+        for chunk in chunks:
+            chunk_size = len(chunk[1])
+            if current_batch and (current_size + chunk_size > max_chars or len(current_batch) >= max_chunks):
+                batches.append(current_batch)
+                current_batch = []
+                current_size = 0
+            
+            current_batch.append(chunk)
+            current_size += chunk_size
+        
+        if current_batch:
+            batches.append(current_batch)
         
-        return chunks
+        return batches
+    
+    def _detect_fields_in_chunks(self, batch: List[tuple]) -> List[List[PlaceholderAnalysis]]:
+        """
+        Analyze several chunks in a single request.
+        
+        Args:
+            batch: List of (chunk_name, chunk_text) tuples
+        
+        Returns:
+            List of detected fields for each chunk, in batch order
+        """
+        if len(batch) == 1:
+            chunk_name, chunk_text = batch[0]
+            return [self._detect_fields_in_chunk(chunk_text, chunk_name)]
+        
+        chunks_json = json.dumps([{"chunk_name": name, "chunk_text": text} for name, text in batch], indent=2)
+        prompt = f"""Analyze each of these document chunks and identify ONLY ACTUAL FIELDS that need to be filled in.
+
+CHUNKS = {chunks_json}
+
+{_FIELD_DETECTION_INSTRUCTIONS}
+Return as a JSON object mapping each chunk_name to the JSON array of fields found in that chunk:
+{{
+  "{batch[0][0]}": [
+    {{
+      "field_name": "company_email",
+      "field_label": "Email",
+      "placeholder_text": "Email: ",
+      "data_type": "email",
+      "suggested_question": "What is the company's email address?",
+      "example": "company@example.com",
+      "required": false,
+      "description": "The email address of the company"
+    }}
+  ],
+  "{batch[1][0]}": []
+}}"""
+
+        try:
+            response = self._cached_call(prompt)
+            return self._parse_batched_chunks_response(response, [name for name, _ in batch])
+        except Exception as e:
+            # Fall back to one request per chunk
+            print(f"⚠ Error analyzing chunks {', '.join(name for name, _ in batch)}: {e}")
+            return [self._detect_fields_in_chunk(chunk_text, chunk_name) for chunk_name, chunk_text in batch]
     
     def _detect_fields_in_chunk(self, chunk_text: str, chunk_name: str) -> List[PlaceholderAnalysis]:
         """Analyze a single chunk and detect fields in it"""
@@ -160,32 +735,7 @@ Chunk: {chunk_name}
 Document:
 {chunk_text}
 
-IDENTIFY ALL PLACEHOLDER TYPES:
-
-Explicit placeholders (replace entire placeholder):
-- [field name] - Square brackets
-- {{field name}} - Curly braces  
-- (field name) - Parentheses
-- _____  - Underscores
-
-Blank fields (keep label, replace blank part):
-- "Label: _____" - Label with underscores
-- "Label:        " - Label with spaces
-- "Label: " - Label with blank
-- "Name:" - Just colon (blank to fill)
-- "By:" - Signature fields with colon
-- "By:        " - Signature fields with spaces after colon
-- "Name:   " - Name fields with spaces
-- Any label ending with ":" followed by spaces/underscores/blank
-
-For EACH valid field you identify:
-1. Field name (e.g., "investor_name", "company_address")
-2. The EXACT placeholder text AS IT APPEARS (e.g., "[Company Name]", "Address: ", "$[_____________]")
-3. Data type (email, address, string, date, currency, phone, number, url)
-4. Natural question to ask user
-5. Example value
-6. Mark as NOT required
-
+{_FIELD_DETECTION_INSTRUCTIONS}
 Return as JSON array:
 [
   {{
@@ -201,7 +751,7 @@ Return as JSON array:
 ]"""
 
         try:
-            response = self._call_openrouter(prompt)
+            response = self._cached_call(prompt)
             analyses = self._parse_detect_all_fields_response(response)
             return analyses
         except Exception as e:
@@ -210,7 +760,8 @@ Return as JSON array:
     
     def _analyze_placeholders_with_llm(self, document_text: str, placeholder_contexts: List[Dict]) -> List[PlaceholderAnalysis]:
         """
-        Analyze placeholders with full document context using LLM.
+        Analyze placeholders with full document context using LLM (an outline and excerpts
+        around the placeholders for documents over FULL_DOCUMENT_PROMPT_LIMIT characters).
         
         Args:
             document_text: Full document text
@@ -233,83 +784,20 @@ Return as JSON array:
             placeholders_list += f"\n{idx}. Placeholder: '{placeholder_text}'\n"
             placeholders_list += f"   Context (100 chars before/after): ...{context}...\n"
         
-        prompt = f"""Analyze this document and the placeholders detected by regex. Identify which placeholders are ACTUAL FIELDS that need to be filled in by the user, versus legal text or definitions that should NOT be filled.
-
-FULL DOCUMENT TEXT:
-{document_text}
+        if len(document_text) <= FULL_DOCUMENT_PROMPT_LIMIT:
+            document_section = f"FULL DOCUMENT TEXT:\n{document_text}"
+        else:
+            # Large document: the placeholder contexts already carry the text around every
+            # occurrence, so send an outline plus the merged regions around the placeholders
+            document_section = self._build_document_excerpt(document_text, placeholder_contexts)
+        
+        prompt = f"""{document_section}
 
 PLACEHOLDERS DETECTED BY REGEX (WITH CONTEXT):
-{placeholders_list}
-
-CRITICAL INSTRUCTIONS:
-1. Review the FULL document context AND the surrounding context for EACH placeholder occurrence listed above
-2. Identify which placeholders are ACTUAL FIELDS that need user input:
-   - Short bracketed placeholders (1-3 words): "[Company Name]", "[COMPANY]", "[Investor Name]", "[name]", "[title]", "[Date of Safe]"
-   - Underscore placeholders like "[_____________]" - these are actual fields that need values
-   - Label fields like "Address: ", "Email: ", "Name: ", "By:"
-   - Signature section fields (even if similar to header fields)
-   - DO NOT include long legal text in brackets/parentheses (even if detected by regex)
-3. IGNORE placeholders that are:
-   - Legal definitions or explanations in parentheses like "(a) Equity Financing..."
-   - Section references like "(i)", "(ii)", "(iii)" when they're just list markers
-   - Legal citations like "(within the meaning of Section 13(d)...)"
-   - Long legal text blocks in parentheses
-4. IMPORTANT: Include ALL signature section placeholders:
-   - "[COMPANY]" is different from "[Company Name]" - include both
-   - "[name]" in company section vs investor section - include both separately
-   - "By:", "Name:", "Title:", "Address:", "Email:" in signature sections
-5. ABSOLUTELY CRITICAL: For placeholders with IDENTICAL TEXT but DIFFERENT CONTEXT:
-   - You MUST examine EACH occurrence's context separately
-   - If the same placeholder text appears with DIFFERENT surrounding context → treat as SEPARATE FIELDS
-   - Example: If "[_____________]" appears multiple times:
-     * Occurrence 1 near "Purchase Amount" or "$" → field_name: "purchase_amount"
-     * Occurrence 2 near "Post-Money Valuation Cap" or "Valuation Cap" → field_name: "post_money_valuation_cap"
-     * Occurrence 3 near "Pre-Money Valuation Cap" → field_name: "pre_money_valuation_cap"
-   - Look at the surrounding text (100 chars before/after) to understand what each occurrence represents
-   - Return ONE entry per occurrence with different context, even if placeholder text is identical
-   - DO NOT group them together - each unique context needs its own field entry
-6. For placeholders with IDENTICAL TEXT and SAME CONTEXT:
-   - Normalize whitespace: "Address: " and "Address:\n" are the SAME field → return ONE entry
-   - If the same placeholder appears multiple times with the SAME meaning → group as ONE field
-7. Provide context-based descriptions to distinguish similar placeholders
-8. When returning placeholder_text, use the CLEANEST version (e.g., "Address: " not "Address:\n                        ")
-9. MANDATORY: You MUST return an entry for EVERY occurrence of actual form fields, even if they have the same placeholder text. Count how many times each placeholder appears in the list above and ensure you return that many entries (if they have different contexts).
-
-Return ONLY actual fields that need filling, as JSON array. For identical placeholder texts with different contexts, return separate entries:
-[
-  {{
-    "field_name": "company_name",
-    "placeholder_text": "[Company Name]",
-    "data_type": "string",
-    "description": "The name of the company issuing the SAFE",
-    "suggested_question": "What is the company name?",
-    "example": "Acme Corp",
-    "required": false
-  }},
-  {{
-    "field_name": "purchase_amount",
-    "placeholder_text": "[_____________]",
-    "data_type": "number",
-    "description": "The amount paid by the investor (Purchase Amount)",
-    "suggested_question": "What is the purchase amount?",
-    "example": "100000",
-    "required": false
-  }},
-  {{
-    "field_name": "post_money_valuation_cap",
-    "placeholder_text": "[_____________]",
-    "data_type": "number",
-    "description": "The post-money valuation cap amount",
-    "suggested_question": "What is the post-money valuation cap?",
-    "example": "5000000",
-    "required": false
-  }}
-]
-
-ONLY return placeholders that are actual form fields, NOT legal text or definitions."""
+{placeholders_list}"""
         
         try:
-            response = self._call_openrouter(prompt)
+            response = self._cached_call(prompt, _PLACEHOLDER_ANALYSIS_INSTRUCTIONS)
             analyses = self._parse_placeholder_analysis_response(response, placeholder_contexts)
             return analyses
         except Exception as e:
@@ -317,30 +805,64 @@ ONLY return placeholders that are actual form fields, NOT legal text or definiti
             # Fallback: create basic analyses from regex placeholders
             return self._create_fallback_analyses(placeholder_contexts)
     
+    def _build_document_excerpt(self, document_text: str, placeholder_contexts: List[Dict]) -> str:
+        """
+        Build a compact stand-in for a large document: its beginning and section headings,
+        followed by the regions around the placeholders, with overlapping regions merged.
+        
+        Args:
+            document_text: Full document text
+            placeholder_contexts: List of dicts with 'position' and 'context' (as built by
+                                  analyze_placeholders_with_context)
+        
+        Returns:
+            Document section of the analysis prompt
+        """
+        # Regions around each placeholder context, as (start, end) offsets
+        windows = []
+        for ctx in placeholder_contexts:
+            context_start = max(0, ctx.get('position', 0) - 100)
+            context_end = context_start + len(ctx.get('context', ''))
+            windows.append((max(0, context_start - EXCERPT_MARGIN), min(len(document_text), context_end + EXCERPT_MARGIN)))
+        
+        # Interval union over the sorted windows
+        merged = []
+        for start, end in sorted(windows):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        
+        headings = [line.strip() for line in _SECTION_HEADING_RE.findall(document_text)]
+        outline = document_text[:OUTLINE_CHARS]
+        if headings:
+            outline += "\n...\nSection headings:\n" + '\n'.join(headings)
+        
+        excerpts = '\n[...]\n'.join(document_text[start:end] for start, end in merged)
+        
+        return f"""DOCUMENT OUTLINE (the full document is {len(document_text)} characters; beginning and section headings):
+{outline}
+
+DOCUMENT EXCERPTS AROUND THE PLACEHOLDERS (omitted text marked with [...]):
+{excerpts}"""
+    
     def _parse_placeholder_analysis_response(self, response: str, placeholder_contexts: List[Dict]) -> List[PlaceholderAnalysis]:
         """Parse LLM response for placeholder analysis"""
         try:
-            import re as regex_module
-            json_match = regex_module.search(r'\[.*\]', response, regex_module.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-            else:
-                json_str = response
-            
-            fields_data = json.loads(json_str)
+            fields_data = _extract_json(response, '[', ']')
             analyses = []
             
-            # Map each LLM response to a placeholder context by matching placeholder text and order
-            placeholder_text_to_contexts = {}
+            # Map each LLM response to a placeholder context by matching placeholder text and order.
+            # Built once and reused for recovery and the missed-occurrence check below
+            placeholder_text_to_contexts = defaultdict(list)
             for ctx in placeholder_contexts:
-                text = ctx['text']
-                if text not in placeholder_text_to_contexts:
-                    placeholder_text_to_contexts[text] = []
-                placeholder_text_to_contexts[text].append(ctx)
+                placeholder_text_to_contexts[ctx['text']].append(ctx)
             
             # Match LLM responses to placeholder contexts
             # For multiple entries with same placeholder_text, match them to different occurrences based on context
             used_contexts = set()
+            context_words_by_id = {}  # id(ctx) -> long words of its context, computed on first use
             placeholder_text_entry_count = {}  # Track how many entries we've seen for each placeholder_text
             
             for data in fields_data:
@@ -362,11 +884,13 @@ ONLY return placeholders that are actual form fields, NOT legal text or definiti
                     # Try to find context that best matches the description
                     best_match = None
                     best_score = 0
+                    # Score based on how many words from description appear in context
+                    description_words = set(word for word in description.split() if len(word) > 3)
                     for ctx in matching_contexts:
-                        context_lower = ctx.get('context', '').lower()
-                        # Score based on how many words from description appear in context
-                        description_words = set(word for word in description.split() if len(word) > 3)
-                        context_words = set(word for word in context_lower.split() if len(word) > 3)
+                        context_words = context_words_by_id.get(id(ctx))
+                        if context_words is None:
+                            context_lower = ctx.get('context', '').lower()
+                            context_words = context_words_by_id[id(ctx)] = set(word for word in context_lower.split() if len(word) > 3)
                         score = len(description_words & context_words)
                         if score > best_score:
                             best_score = score
@@ -385,7 +909,8 @@ ONLY return placeholders that are actual form fields, NOT legal text or definiti
                     used_contexts.add(id(ctx))
                 else:
                     # Fallback: use first context with matching text
-                    ctx = placeholder_text_to_contexts.get(placeholder_text, [{}])[0] if placeholder_text_to_contexts.get(placeholder_text) else {}
+                    contexts = placeholder_text_to_contexts.get(placeholder_text)
+                    ctx = contexts[0] if contexts else {}
                 
                 analysis = PlaceholderAnalysis(
                     placeholder_text=placeholder_text,
@@ -401,66 +926,46 @@ ONLY return placeholders that are actual form fields, NOT legal text or definiti
             
             # Deduplicate analyses - group similar placeholders (whitespace variations)
             # BUT: Keep separate entries if they have different field_names (same placeholder text, different context)
-            def normalize_placeholder(text: str) -> str:
-                """Normalize placeholder text for comparison (remove extra whitespace)"""
-                # Remove leading/trailing whitespace and normalize internal whitespace
-                # Replace all whitespace (spaces, tabs, newlines) with single space
-                normalized = ' '.join(text.strip().split())
-                # For label fields, normalize to "Label:"
-                if ':' in normalized:
-                    label_part = normalized.split(':')[0].strip()
-                    return label_part + ':'
-                return normalized
+            regex_detected_texts = set(placeholder_text_to_contexts)
             
-            # Group analyses by (normalized placeholder text, field_name) tuple
-            # This allows same placeholder text with different field_names to be kept separate
-            key_to_analyses = {}
-            for analysis in analyses:
-                normalized = normalize_placeholder(analysis.placeholder_text)
-                key = (normalized, analysis.placeholder_name)  # Use both text and field_name as key
-                if key not in key_to_analyses:
-                    key_to_analyses[key] = []
-                key_to_analyses[key].append(analysis)
+            # Prefer:
+            # 1. One that matches regex-detected text exactly
+            # 2. One with the best description (not fallback)
+            def score_analysis(a):
+                score = 0
+                if a.placeholder_text in regex_detected_texts:
+                    score += 1000  # Prefer regex-detected exact matches
+                if a.description and not a.description.startswith("Field found"):
+                    score += len(a.description)  # Prefer better descriptions
+                return score
             
-            # Keep only one analysis per (normalized placeholder, field_name) combination
-            # But keep separate entries for different field_names even if placeholder text is identical
-            deduplicated_analyses = []
-            regex_detected_texts = {ctx['text'] for ctx in placeholder_contexts}
+            # Keep only the best analysis per (normalized placeholder text, field_name) key, in a single
+            # pass over the LLM entries and the recovered ones below. Using field_name in the key keeps
+            # same placeholder text with different field_names (different context) as separate entries.
+            # Keys stay in first-appearance order; on equal scores the earlier analysis is kept
+            best_per_key = {}  # (normalized, field_name) -> (score, analysis)
+            variation_counts = {}  # (normalized, field_name) -> number of analyses seen
             
-            for (normalized, field_name), analysis_list in key_to_analyses.items():
-                if len(analysis_list) > 1:
-                    # Multiple variations with same placeholder text AND field_name - deduplicate
-                    # Prefer:
-                    # 1. One that matches regex-detected text exactly
-                    # 2. One with the best description (not fallback)
-                    def score_analysis(a):
-                        score = 0
-                        if a.placeholder_text in regex_detected_texts:
-                            score += 1000  # Prefer regex-detected exact matches
-                        if a.description and not a.description.startswith("Field found"):
-                            score += len(a.description)  # Prefer better descriptions
-                        return score
-                    
-                    best = max(analysis_list, key=score_analysis)
-                    deduplicated_analyses.append(best)
-                    if len(analysis_list) > 1:
-                        variations = [a.placeholder_text[:50] + '...' if len(a.placeholder_text) > 50 else a.placeholder_text for a in analysis_list]
-                        print(f"  ℹ Deduplicated {len(analysis_list)} variations of '{normalized}' (field: {field_name}): {variations[:2]}... → keeping '{best.placeholder_text[:50]}...'")
-                else:
-                    deduplicated_analyses.append(analysis_list[0])
+            def add_analysis(analysis):
+                key = (_normalize_placeholder(analysis.placeholder_text), analysis.placeholder_name)
+                score = score_analysis(analysis)
+                variation_counts[key] = variation_counts.get(key, 0) + 1
+                current = best_per_key.get(key)
+                if current is None or score > current[0]:
+                    best_per_key[key] = (score, analysis)
+            
+            for analysis in analyses:
+                add_analysis(analysis)
             
             # Check which placeholders were detected by regex but NOT returned by LLM
-            regex_placeholder_texts = {ctx['text'] for ctx in placeholder_contexts}
             # Normalize LLM returned texts for comparison
-            llm_returned_normalized = {normalize_placeholder(a.placeholder_text) for a in deduplicated_analyses}
-            missing_from_llm = []
-            for text in regex_placeholder_texts:
-                normalized_text = normalize_placeholder(text)
-                if normalized_text not in llm_returned_normalized:
-                    missing_from_llm.append(text)
+            llm_returned_normalized = {normalized for normalized, _ in best_per_key}
+            missing_from_llm = [text for text in regex_detected_texts
+                                if _normalize_placeholder(text) not in llm_returned_normalized]
             
             if missing_from_llm:
-                print(f"\n⚠ LLM did not return {len(missing_from_llm)} placeholder(s) detected by regex:")
+                if VERBOSE_LOGGING:
+                    print(f"\n⚠ LLM did not return {len(missing_from_llm)} placeholder(s) detected by regex:")
                 for text in sorted(missing_from_llm):
                     # Check if it's likely an actual field:
                     # - Short bracketed placeholders (1-3 words): [COMPANY], [name], [title]
@@ -475,81 +980,48 @@ ONLY return placeholders that are actual form fields, NOT legal text or definiti
                     )
                     
                     if is_likely_field:
-                        print(f"  - '{text}' (likely an actual field - adding to list)")
-                        # Find context for this placeholder
-                        matching_contexts = [ctx for ctx in placeholder_contexts if ctx['text'] == text]
-                        if matching_contexts:
-                            ctx = matching_contexts[0]
-                            base_name = ctx['name'].lower().replace(' ', '_')
-                            analysis = PlaceholderAnalysis(
-                                placeholder_text=text,
-                                placeholder_name=base_name,
-                                data_type='string',
-                                description=f"Field found in document: {ctx.get('context', '')[:100]}...",
-                                suggested_question=f"What is the {ctx['name'].lower()}?",
-                                example='',
-                                required=False,
-                                validation_hint=None
-                            )
-                            deduplicated_analyses.append(analysis)
+                        if VERBOSE_LOGGING:
+                            print(f"  - '{text}' (likely an actual field - adding to list)")
+                        # Use the context of the first occurrence of this placeholder
+                        ctx = placeholder_text_to_contexts[text][0]
+                        base_name = ctx['name'].lower().replace(' ', '_')
+                        add_analysis(PlaceholderAnalysis(
+                            placeholder_text=text,
+                            placeholder_name=base_name,
+                            data_type='string',
+                            description=f"Field found in document: {ctx.get('context', '')[:100]}...",
+                            suggested_question=f"What is the {ctx['name'].lower()}?",
+                            example='',
+                            required=False,
+                            validation_hint=None
+                        ))
                     else:
-                        print(f"  - '{text}' (likely legal text - correctly filtered)")
+                        if VERBOSE_LOGGING:
+                            print(f"  - '{text}' (likely legal text - correctly filtered)")
             
-            # Check if LLM missed any occurrences - ensure all actual fields are detected
-            # Group placeholder contexts by text to see if any were missed
-            placeholder_text_to_contexts = {}
-            for ctx in placeholder_contexts:
-                text = ctx['text']
-                if text not in placeholder_text_to_contexts:
-                    placeholder_text_to_contexts[text] = []
-                placeholder_text_to_contexts[text].append(ctx)
+            final_deduplicated = [analysis for _, analysis in best_per_key.values()]
             
-            # For each placeholder text, check if we have analyses for all occurrences
-            for placeholder_text, contexts in placeholder_text_to_contexts.items():
-                # Skip legal text placeholders (long parentheses, etc.)
-                is_likely_field = (
-                    (placeholder_text.startswith('[') and placeholder_text.endswith(']') and len(placeholder_text.strip('[]').split()) <= 3) or
-                    (placeholder_text.strip().endswith(':') and len(placeholder_text.strip().rstrip(':')) < 20) or
-                    ('_____' in placeholder_text)  # Underscore placeholders
-                )
+            if VERBOSE_LOGGING:
+                for (normalized, field_name), count in variation_counts.items():
+                    if count > 1:
+                        print(f"  ℹ Deduplicated {count} variations of '{normalized}' (field: {field_name}) → keeping '{best_per_key[(normalized, field_name)][1].placeholder_text[:50]}...'")
                 
-                if is_likely_field and len(contexts) > 1:
-                    # Check how many analyses we have for this placeholder
-                    matching_analyses = [a for a in deduplicated_analyses 
-                                       if normalize_placeholder(a.placeholder_text) == normalize_placeholder(placeholder_text)]
+                # Check if LLM missed any occurrences - ensure all actual fields are detected
+                analysis_counts = Counter(_normalize_placeholder(a.placeholder_text) for a in final_deduplicated)
+                for placeholder_text, contexts in placeholder_text_to_contexts.items():
+                    # Skip legal text placeholders (long parentheses, etc.)
+                    is_likely_field = (
+                        (placeholder_text.startswith('[') and placeholder_text.endswith(']') and len(placeholder_text.strip('[]').split()) <= 3) or
+                        (placeholder_text.strip().endswith(':') and len(placeholder_text.strip().rstrip(':')) < 20) or
+                        ('_____' in placeholder_text)  # Underscore placeholders
+                    )
                     
-                    if len(matching_analyses) < len(contexts):
-                        print(f"\n  ⚠ Found {len(contexts)} occurrences of '{placeholder_text}' but only {len(matching_analyses)} analysis entries")
+                    # Check how many analyses we have for this placeholder
+                    matching_count = analysis_counts[_normalize_placeholder(placeholder_text)]
+                    if is_likely_field and len(contexts) > 1 and matching_count < len(contexts):
+                        print(f"\n  ⚠ Found {len(contexts)} occurrences of '{placeholder_text}' but only {matching_count} analysis entries")
                         print(f"     LLM may have missed some occurrences - they will be handled during replacement")
             
-            # FINAL deduplication pass after auto-recovery
-            # This ensures auto-recovered placeholders are also deduplicated
-            final_normalized_to_analyses = {}
-            for analysis in deduplicated_analyses:
-                normalized = normalize_placeholder(analysis.placeholder_text)
-                key = (normalized, analysis.placeholder_name)  # Use both text and field_name
-                if key not in final_normalized_to_analyses:
-                    final_normalized_to_analyses[key] = []
-                final_normalized_to_analyses[key].append(analysis)
-            
-            final_deduplicated = []
-            for (normalized, field_name), analysis_list in final_normalized_to_analyses.items():
-                if len(analysis_list) > 1:
-                    # Prefer regex-detected exact matches, then better descriptions
-                    def score_analysis(a):
-                        score = 0
-                        if a.placeholder_text in regex_detected_texts:
-                            score += 1000
-                        if a.description and not a.description.startswith("Field found"):
-                            score += len(a.description)
-                        return score
-                    best = max(analysis_list, key=score_analysis)
-                    final_deduplicated.append(best)
-                    if len(analysis_list) > 1:
-                        print(f"  ℹ Final deduplication: {len(analysis_list)} variations of '{normalized}' (field: {field_name}) → keeping best match")
-                else:
-                    final_deduplicated.append(analysis_list[0])
-            
             return final_deduplicated
         except Exception as e:
             print(f"Error parsing placeholder analysis response: {e}")
@@ -588,69 +1060,161 @@ ONLY return placeholders that are actual form fields, NOT legal text or definiti
         
         return analyses
     
+    def _parse_batched_chunks_response(self, response: str, chunk_names: List[str]) -> List[List[PlaceholderAnalysis]]:
+        """
+        Parse LLM response for a batch of chunks.
+        
+        Raises ValueError if the response is not a JSON object of chunk_name -> fields.
+        """
+        fields_by_chunk = _extract_json(response, '{', '}')
+        if not isinstance(fields_by_chunk, dict):
+            raise ValueError("Expected a JSON object of chunk_name -> fields")
+        
+        return [self._build_field_analyses(fields_by_chunk.get(name) or []) for name in chunk_names]
+    
     def _parse_detect_all_fields_response(self, response: str) -> List[PlaceholderAnalysis]:
         """Parse LLM response for detect_all_fields"""
         try:
-            import re as regex_module
-            json_match = regex_module.search(r'\[.*\]', response, regex_module.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-            else:
-                json_str = response
-            
-            fields_data = json.loads(json_str)
-            analyses = []
-            
-            for data in fields_data:
-                field_id = data.get('field_name', data.get('field_label', '').lower().replace(' ', '_'))
-                actual_placeholder = data.get('placeholder_text') or data.get('actual_placeholder')
-                
-                if not actual_placeholder:
-                    actual_placeholder = f"[{field_id}]"
-                
-                analysis = PlaceholderAnalysis(
-                    placeholder_text=actual_placeholder,
-                    placeholder_name=field_id,
-                    data_type=data.get('data_type', 'string'),
-                    description=data.get('description', data.get('field_label', '')),
-                    suggested_question=data.get('suggested_question', f"What is the {data.get('field_label', 'field').lower()}?"),
-                    example=data.get('example', ''),
-                    required=False,
-                    validation_hint=None
-                )
-                analyses.append(analysis)
-            
-            return analyses
+            return self._build_field_analyses(_extract_json(response, '[', ']'))
         except Exception as e:
             print(f"Error parsing detect_all_fields response: {e}")
             return []
     
-    def _call_openrouter(self, prompt: str) -> str:
-        """Call OpenRouter API with the Qwen model"""
+    def _build_field_analyses(self, fields_data: List[Dict]) -> List[PlaceholderAnalysis]:
+        """Convert field dicts returned by the LLM into PlaceholderAnalysis objects"""
+        return [self._build_field_analysis(data) for data in fields_data]
+    
+    @staticmethod
+    def _build_field_analysis(data: Dict) -> PlaceholderAnalysis:
+        """Convert one field dict returned by the LLM into a PlaceholderAnalysis"""
+        # Fallback values are only computed when the LLM left the key out
+        field_id = data['field_name'] if 'field_name' in data else data.get('field_label', '').lower().replace(' ', '_')
+        
+        return PlaceholderAnalysis(
+            placeholder_text=data.get('placeholder_text') or data.get('actual_placeholder') or f"[{field_id}]",
+            placeholder_name=field_id,
+            data_type=data.get('data_type', 'string'),
+            description=data['description'] if 'description' in data else data.get('field_label', ''),
+            suggested_question=(
+                data['suggested_question'] if 'suggested_question' in data
+                else f"What is the {data.get('field_label', 'field').lower()}?"
+            ),
+            example=data.get('example', ''),
+            required=False,
+            validation_hint=None
+        )
+    
+    def _cached_call(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Call OpenRouter, reusing the stored response if the same prompt was sent to the same model before"""
+        if not LLM_CACHE_ENABLED:
+            return self._call_openrouter(prompt, system_prompt)
+        
+        cache_text = prompt if system_prompt is None else f"{system_prompt}|{prompt}"
+        key = hashlib.sha256(f"{self.model}|{cache_text}".encode('utf-8')).hexdigest()
+        
+        # Recent responses are served from memory without touching the database
+        now = time.time()
+        with _MEMORY_CACHE_LOCK:
+            entry = _MEMORY_CACHE.get(key)
+            if entry is not None and entry[1] > now:
+                _MEMORY_CACHE.move_to_end(key)
+                return entry[0]
+        
+        # Cache errors are never fatal; the API is called as if there were no cache
+        try:
+            with closing(self._open_cache()) as conn, conn:
+                row = conn.execute("SELECT response, expires FROM responses WHERE key = ? AND expires > ?",
+                                   (key, now)).fetchone()
+            if row is not None:
+                if VERBOSE_LOGGING:
+                    print(f"  ✓ Using cached LLM response ({key[:12]})")
+                self._remember_response(key, row[0], row[1])
+                return row[0]
+        except (sqlite3.Error, OSError) as e:
+            print(f"LLM cache read error: {e}", file=sys.stderr)
+        
+        response = self._call_openrouter(prompt, system_prompt)
+        expires = time.time() + LLM_CACHE_TTL
+        self._remember_response(key, response, expires)
+        
+        try:
+            with closing(self._open_cache()) as conn, conn:
+                conn.execute("INSERT OR REPLACE INTO responses (key, response, expires) VALUES (?, ?, ?)",
+                             (key, response, expires))
+                # Expired rows are deleted rather than only skipped, and the newest
+                # LLM_CACHE_MAX_ENTRIES rows are kept
+                conn.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+                conn.execute("DELETE FROM responses WHERE key NOT IN "
+                             "(SELECT key FROM responses ORDER BY expires DESC LIMIT ?)",
+                             (LLM_CACHE_MAX_ENTRIES,))
+        except (sqlite3.Error, OSError) as e:
+            print(f"LLM cache write error: {e}", file=sys.stderr)
+        
+        return response
+    
+    def _remember_response(self, key: str, response: str, expires: float):
+        """Keep a response in the in-memory cache, evicting the least recently used ones"""
+        with _MEMORY_CACHE_LOCK:
+            _MEMORY_CACHE[key] = (response, expires)
+            _MEMORY_CACHE.move_to_end(key)
+            while len(_MEMORY_CACHE) > MEMORY_CACHE_SIZE:
+                _MEMORY_CACHE.popitem(last=False)
+    
+    def _open_cache(self) -> sqlite3.Connection:
+        """Open the response cache database, creating its table if needed"""
+        cache_dir = os.path.dirname(LLM_CACHE_PATH)
+        if cache_dir:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        conn = sqlite3.connect(LLM_CACHE_PATH, timeout=10)
+        conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, expires REAL NOT NULL)")
+        return conn
+    
+    def _call_openrouter(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """
+        Call OpenRouter API with the Qwen model
+        
+        Args:
+            prompt: User message
+            system_prompt: Optional static instructions, sent first and marked as a prompt
+                           cache breakpoint (providers without prompt caching ignore the marker)
+        """
+        # Referer and title headers are set on the shared session
         headers = {
             "Authorization": f"Bearer {self.api_key}",
-            "HTTP-Referer": "https://github.com/anishgillella/lexsy-document-ai",
-            "X-Title": "Lexsy Document AI",
             "Content-Type": "application/json"
         }
         
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {
+                "role": "system",
+                "content": [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+            })
+        
         payload = {
             "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
             "temperature": 0,
-            "max_tokens": 4000
+            "max_tokens": MAX_RESPONSE_TOKENS
         }
         
+        # Wait for rate limit budget (prompt tokens estimated at ~4 characters each)
+        if _REQUEST_BUCKET:
+            _REQUEST_BUCKET.acquire()
+        if _TOKEN_BUCKET:
+            _TOKEN_BUCKET.acquire((len(prompt) + len(system_prompt or '')) // 4 + MAX_RESPONSE_TOKENS)
+        
         try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                data=json.dumps(payload),
-                timeout=60
-            )
+            with _REQUEST_SLOTS:
+                response = _HTTP_SESSION.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=headers,
+                    data=_json_dumps(payload),
+                    timeout=60
+                )
             
             response.raise_for_status()
-            result = response.json()
+            result = _json_loads(response.content)
             
             if 'choices' in result and len(result['choices']) > 0:
                 return result['choices'][0]['message']['content']
@@ -7,9 +7,19 @@ gets user answers, and fills the document
 
 import sys
 import os
+import json
+import logging
+import argparse
 from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from document_processor import DocumentProcessor
-from llm_analyzer import LLMAnalyzer
+from llm_analyzer import LLMAnalyzer, PlaceholderAnalysis, analyses_from_regex, MAX_CONCURRENT_REQUESTS
+
+# Progress output goes through logging (configured in main()) so it can be quieted or expanded;
+# the interactive questions are always printed
+logger = logging.getLogger("lexsy")
 
 
 def get_user_input(question: str, example: str = "", data_type: str = "string") -> str:
@@ -44,205 +54,278 @@ def get_user_input(question: str, example: str = "", data_type: str = "string")
             print("Please provide an answer or type 'skip' to leave blank.")
 
 
-def process_document(doc_path: str):
+def process_document(doc_path: str, answers: Optional[Dict[str, str]] = None):
     """
     Main processing function
     
     Args:
         doc_path: Path to the .docx file
+        answers: Optional pre-supplied answers keyed by field name or placeholder text;
+                 fields found here are filled without prompting
+    """
+    analyzed = analyze_document(doc_path)
+    if analyzed:
+        fill_document(*analyzed, answers)
+
+
+def process_documents(doc_paths: List[str], answers: Optional[Dict[str, str]] = None):
+    """
+    Process several documents: detection and LLM analysis run for all of them concurrently,
+    then each document's questions are asked and it is filled, in the given order
+    
+    Args:
+        doc_paths: Paths to the .docx files
+        answers: Optional pre-supplied answers shared by all documents (see process_document)
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_CONCURRENT_REQUESTS, len(doc_paths)))) as executor:
+        analyzed_documents = list(executor.map(analyze_document, doc_paths))
+    
+    for doc_path, analyzed in zip(doc_paths, analyzed_documents):
+        if analyzed:
+            logger.info(f"\n{'='*60}\nDocument: {doc_path}\n{'='*60}")
+            fill_document(*analyzed, answers)
+
+
+def analyze_document(doc_path: str) -> Optional[Tuple[DocumentProcessor, List[PlaceholderAnalysis]]]:
+    """
+    Detect a document's placeholders and analyze them with the LLM (steps 1 and 2)
+    
+    Args:
+        doc_path: Path to the .docx file
+    
+    Returns:
+        Tuple of (processor, analyses), or None if there is nothing to fill
     """
-    print("=" * 60)
-    print("Lexsy Document AI - Document Processor")
-    print("=" * 60)
-    print(f"\nProcessing: {doc_path}\n")
+    logger.info("=" * 60)
+    logger.info("Lexsy Document AI - Document Processor")
+    logger.info("=" * 60)
+    logger.info(f"\nProcessing: {doc_path}\n")
     
     # Step 1: Load and detect placeholders with python-docx
-    print("Step 1: Loading document and detecting placeholders...")
+    logger.info("Step 1: Loading document and detecting placeholders...")
     processor = DocumentProcessor(doc_path)
     result = processor.process()
     
     if not result.get('success'):
-        print(f"❌ Error: {result.get('error', 'Unknown error')}")
-        return
+        logger.error(f"❌ Error: {result.get('error', 'Unknown error')}")
+        return None
     
     placeholders_count = result.get('placeholder_count', 0)
-    print(f"✓ Found {placeholders_count} placeholders using python-docx\n")
-    
-    # Log what python-docx extracted
-    print("=" * 60)
-    print("PYTHON-DOCX OUTPUT:")
-    print("=" * 60)
-    print(f"\n📄 Extracted Text Length: {result.get('text_length', 0)} characters")
-    print(f"\n📄 Extracted Text (first 500 chars):")
-    print("-" * 60)
-    full_text_preview = processor.full_text[:500] if processor.full_text else ""
-    print(full_text_preview)
-    if len(processor.full_text) > 500:
-        print(f"... (truncated, total {len(processor.full_text)} chars)")
-    print("-" * 60)
-    
-    print(f"\n🔍 Detected Placeholders ({placeholders_count}):")
-    print("-" * 60)
+    logger.info(f"✓ Found {placeholders_count} placeholders using python-docx\n")
     placeholders_data = result.get('placeholders', [])
-    for idx, ph in enumerate(placeholders_data, 1):
-        print(f"  {idx}. Text: '{ph['text']}'")
-        print(f"     Name: {ph['name']}")
-        print(f"     Format: {ph['format']}")
-        print(f"     Position: {ph['position']}-{ph['end_position']}")
-        print(f"     Detected by: {ph['detected_by']}")
-        print()
-    print("=" * 60)
-    print()
+    
+    # Log what python-docx extracted (the dump is only built when it will be shown)
+    if logger.isEnabledFor(logging.DEBUG):
+        lines = [
+            "=" * 60,
+            "PYTHON-DOCX OUTPUT:",
+            "=" * 60,
+            f"\n📄 Extracted Text Length: {result.get('text_length', 0)} characters",
+            f"\n📄 Extracted Text (first 500 chars):",
+            "-" * 60,
+            processor.full_text[:500] if processor.full_text else "",
+        ]
+        if len(processor.full_text) > 500:
+            lines.append(f"... (truncated, total {len(processor.full_text)} chars)")
+        lines += ["-" * 60, f"\n🔍 Detected Placeholders ({placeholders_count}):", "-" * 60]
+        for idx, ph in enumerate(placeholders_data, 1):
+            lines += [
+                f"  {idx}. Text: '{ph['text']}'",
+                f"     Name: {ph['name']}",
+                f"     Format: {ph['format']}",
+                f"     Position: {ph['position']}-{ph['end_position']}",
+                f"     Detected by: {ph['detected_by']}",
+                "",
+            ]
+        lines += ["=" * 60, ""]
+        logger.debug('\n'.join(lines))
     
     if placeholders_count == 0:
-        print("No placeholders detected. Document may already be filled or use a different format.")
-        return
+        logger.info("No placeholders detected. Document may already be filled or use a different format.")
+        return None
     
     # Step 2: Analyze with LLM
-    print("Step 2: Analyzing placeholders with LLM...")
+    logger.info("Step 2: Analyzing placeholders with LLM...")
     try:
         llm_analyzer = LLMAnalyzer()
         full_text = processor.full_text
         
         # Use LLM to analyze regex-detected placeholders with context
-        placeholders_data = result.get('placeholders', [])
         analyses = llm_analyzer.analyze_placeholders_with_context(full_text, placeholders_data)
         
         if not analyses:
-            print("⚠ LLM did not detect fields. Using regex-detected placeholders...")
+            logger.warning("⚠ LLM did not detect fields. Using regex-detected placeholders...")
             # Fallback: use regex placeholders
-            placeholders_data = result.get('placeholders', [])
-            analyses = []
-            for ph in placeholders_data:
-                from llm_analyzer import PlaceholderAnalysis
-                analyses.append(PlaceholderAnalysis(
-                    placeholder_text=ph['text'],
-                    placeholder_name=ph['name'],
-                    data_type='string',
-                    description=f"Field: {ph['name']}",
-                    suggested_question=f"What is the {ph['name'].lower().replace('_', ' ')}?",
-                    example="",
-                    required=False,
-                    validation_hint=None
-                ))
+            analyses = analyses_from_regex(placeholders_data)
         
-        print(f"✓ LLM analyzed {len(analyses)} unique fields\n")
+        logger.info(f"✓ LLM analyzed {len(analyses)} unique fields\n")
         
         # Log what LLM detected
-        print("=" * 60)
-        print("LLM OUTPUT:")
-        print("=" * 60)
-        print(f"\n🤖 LLM Detected Fields ({len(analyses)}):")
-        print("-" * 60)
-        for idx, analysis in enumerate(analyses, 1):
-            print(f"  {idx}. Placeholder Text: '{analysis.placeholder_text}'")
-            print(f"     Field Name: {analysis.placeholder_name}")
-            print(f"     Data Type: {analysis.data_type}")
-            print(f"     Description: {analysis.description}")
-            print(f"     Question: {analysis.suggested_question}")
-            print(f"     Example: {analysis.example}")
-            print(f"     Required: {analysis.required}")
-            print()
-        print("=" * 60)
-        print()
+        if logger.isEnabledFor(logging.DEBUG):
+            lines = ["=" * 60, "LLM OUTPUT:", "=" * 60, f"\n🤖 LLM Detected Fields ({len(analyses)}):", "-" * 60]
+            for idx, analysis in enumerate(analyses, 1):
+                lines += [
+                    f"  {idx}. Placeholder Text: '{analysis.placeholder_text}'",
+                    f"     Field Name: {analysis.placeholder_name}",
+                    f"     Data Type: {analysis.data_type}",
+                    f"     Description: {analysis.description}",
+                    f"     Question: {analysis.suggested_question}",
+                    f"     Example: {analysis.example}",
+                    f"     Required: {analysis.required}",
+                    "",
+                ]
+            lines += ["=" * 60, ""]
+            logger.debug('\n'.join(lines))
         
     except Exception as e:
-        print(f"⚠ LLM analysis failed: {e}")
-        print("Using basic placeholder detection...")
+        logger.warning(f"⚠ LLM analysis failed: {e}")
+        logger.warning("Using basic placeholder detection...")
         # Fallback to basic analysis
-        placeholders_data = result.get('placeholders', [])
-        analyses = []
-        for ph in placeholders_data:
-            from llm_analyzer import PlaceholderAnalysis
-            analyses.append(PlaceholderAnalysis(
-                placeholder_text=ph['text'],
-                placeholder_name=ph['name'],
-                data_type='string',
-                description=f"Field: {ph['name']}",
-                suggested_question=f"What is the {ph['name'].lower().replace('_', ' ')}?",
-                example="",
-                required=False,
-                validation_hint=None
-            ))
+        analyses = analyses_from_regex(placeholders_data)
+    
+    return processor, analyses
+
+
+def fill_document(processor: DocumentProcessor, analyses: List[PlaceholderAnalysis],
+                  answers: Optional[Dict[str, str]] = None):
+    """
+    Collect answers for the analyzed fields and fill the document (steps 3 and 4)
     
+    Args:
+        processor: Processor of the analyzed document
+        analyses: Fields to ask about
+        answers: Optional pre-supplied answers (see process_document)
+    """
     # Step 3: Get user answers
-    print("Step 3: Collecting user answers...")
-    print(f"\nYou'll be asked {len(analyses)} questions. Answer each one or type 'skip' to leave blank.\n")
+    logger.info("Step 3: Collecting user answers...")
+    answers = answers or {}
+    if answers:
+        logger.info(f"\nUsing {len(answers)} pre-supplied answers; you'll only be asked about fields they don't cover.\n")
+    else:
+        logger.info(f"\nYou'll be asked {len(analyses)} questions. Answer each one or type 'skip' to leave blank.\n")
     
     # Check for duplicate placeholder texts with different field names
-    placeholder_text_counts = {}
-    for analysis in analyses:
-        text = analysis.placeholder_text
-        if text not in placeholder_text_counts:
-            placeholder_text_counts[text] = []
-        placeholder_text_counts[text].append(analysis.placeholder_name)
+    placeholder_text_counts = Counter(analysis.placeholder_text for analysis in analyses)
     
     values = {}
     for i, analysis in enumerate(analyses, 1):
-        print(f"\n[{i}/{len(analyses)}]")
-        answer = get_user_input(
-            question=analysis.suggested_question,
-            example=analysis.example,
-            data_type=analysis.data_type
-        )
+        name = analysis.placeholder_name
+        text = analysis.placeholder_text
+        
+        if name in answers:
+            answer = answers[name]
+        elif text in answers:
+            answer = answers[text]
+        else:
+            print(f"\n[{i}/{len(analyses)}]")
+            answer = get_user_input(
+                question=analysis.suggested_question,
+                example=analysis.example,
+                data_type=analysis.data_type
+            )
         
         if answer:
             # If multiple analyses have the same placeholder_text but different field_names,
             # use composite key to distinguish them
-            if len(placeholder_text_counts[analysis.placeholder_text]) > 1:
+            if placeholder_text_counts[text] > 1:
                 # Use composite key: placeholder_text__field_name
-                key = f"{analysis.placeholder_text}__field_{analysis.placeholder_name}"
+                key = f"{text}__field_{name}"
             else:
                 # Single occurrence, use placeholder text directly
-                key = analysis.placeholder_text
+                key = text
             values[key] = answer
     
     if not values:
-        print("\n⚠ No values provided. Exiting without filling document.")
+        logger.warning("\n⚠ No values provided. Exiting without filling document.")
         return
     
     # Step 4: Fill placeholders
-    print(f"\nStep 4: Filling {len(values)} placeholders in document...")
+    logger.info(f"\nStep 4: Filling {len(values)} placeholders in document...")
     success, output_path = processor.fill_placeholders(values)
     
     if success:
-        print(f"\n{'='*60}")
-        print("✓ SUCCESS!")
-        print(f"✓ Filled document saved to: {output_path}")
-        print(f"{'='*60}\n")
+        logger.info(f"\n{'='*60}\n✓ SUCCESS!\n✓ Filled document saved to: {output_path}\n{'='*60}\n")
     else:
-        print("\n❌ Failed to fill document")
+        logger.error("\n❌ Failed to fill document")
+
+
+def load_answers(answers_path: Path) -> Dict[str, str]:
+    """
+    Load pre-supplied answers from a JSON file
+    
+    Args:
+        answers_path: Path to a JSON object mapping field names or placeholder texts to values
+    
+    Returns:
+        Dictionary of answers with values converted to strings
+    """
+    with open(answers_path, 'rb') as f:
+        data = json.loads(f.read())
+    
+    if not isinstance(data, dict):
+        raise ValueError("answers file must contain a JSON object")
+    
+    return {key: '' if value is None else str(value) for key, value in data.items()}
 
 
 def main():
     """Main entry point"""
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <path_to_document.docx>")
-        print("\nExample:")
-        print("  python main.py samples/rent-receipt.docx")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Fill placeholders in a Word document",
+        epilog="Example:\n  python main.py samples/rent-receipt.docx --answers answers.json",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('doc_paths', nargs='+', metavar='doc_path',
+                        help="Path to the .docx file; with several files, all are analyzed concurrently "
+                             "before their questions are asked")
+    parser.add_argument('--answers', type=Path,
+                        help="JSON file of answers keyed by field name or placeholder text; "
+                             "only fields missing from it are asked interactively")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument('-v', '--verbose', action='store_true',
+                           help="Also show the extracted text, detected placeholders and LLM fields")
+    verbosity.add_argument('-q', '--quiet', action='store_true', help="Only show warnings and errors")
+    args = parser.parse_args()
     
-    doc_path = sys.argv[1]
+    if args.verbose:
+        log_level = logging.DEBUG
+    elif args.quiet:
+        log_level = logging.WARNING
+    else:
+        log_level = os.environ.get('LEXSY_LOG', 'INFO').upper()
+        if not isinstance(logging.getLevelName(log_level), int):
+            log_level = logging.INFO
+    logging.basicConfig(level=log_level, format='%(message)s', stream=sys.stdout)
     
-    # Validate file exists
-    if not os.path.exists(doc_path):
-        print(f"❌ Error: File not found: {doc_path}")
-        sys.exit(1)
+    for doc_path in args.doc_paths:
+        # Validate file exists
+        if not os.path.exists(doc_path):
+            logger.error(f"❌ Error: File not found: {doc_path}")
+            sys.exit(1)
+        
+        # Validate file extension
+        if not doc_path.lower().endswith('.docx'):
+            logger.error(f"❌ Error: File must be a .docx file: {doc_path}")
+            sys.exit(1)
     
-    # Validate file extension
-    if not doc_path.lower().endswith('.docx'):
-        print(f"❌ Error: File must be a .docx file")
-        sys.exit(1)
+    answers = None
+    if args.answers:
+        try:
+            answers = load_answers(args.answers)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Error: Could not read answers file {args.answers}: {e}")
+            sys.exit(1)
     
     try:
-        process_document(doc_path)
+        if len(args.doc_paths) == 1:
+            process_document(args.doc_paths[0], answers)
+        else:
+            process_documents(args.doc_paths, answers)
     except KeyboardInterrupt:
-        print("\n\n⚠ Process interrupted by user.")
+        logger.warning("\n\n⚠ Process interrupted by user.")
         sys.exit(1)
     except Exception as e:
-        print(f"\n❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"\n❌ Error: {e}")
         sys.exit(1)
 
 
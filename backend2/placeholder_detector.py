@@ -4,11 +4,15 @@ Detects both explicit (bracketed) and implicit (blank field) placeholders
 """
 
 import re
+import threading
+from collections import OrderedDict
+from operator import attrgetter
 from typing import List, Dict
 from dataclasses import dataclass
 
 
-@dataclass
+# slots=True needs Python 3.10+, the documented minimum
+@dataclass(slots=True, frozen=True)
 class Placeholder:
     """Represents a detected placeholder"""
     text: str  # Full placeholder text as it appears
@@ -19,25 +23,56 @@ class Placeholder:
     detected_by: str = 'regex'  # 'regex' or 'heuristic'
 
 
+# Literal text every match of a pattern must contain; patterns whose literal is absent
+# from the text cannot match and are skipped without running the regex
+_REQUIRED_LITERALS = {
+    'bracket': '[',
+    'curly_bracket': '{',
+    'parenthesis': '(',
+    'double_curly_bracket': '{{',
+    'angle_bracket': '<',
+    'double_underscore': '__',
+    'underscore': '_',
+    'blank_field': ':',
+}
+
+# Matches any character a placeholder of some format must contain; text without one has no placeholders
+_ANY_REQUIRED_CHAR_RE = re.compile('[' + re.escape(''.join(sorted({literal[0] for literal in _REQUIRED_LITERALS.values()}))) + ']')
+
+# Patterns for the different explicit placeholder formats, compiled once at import
+_PATTERNS = [
+    # Square brackets: [placeholder]
+    (re.compile(r'\[([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\]', re.MULTILINE), 'bracket'),
+    # Curly brackets: {placeholder}
+    (re.compile(r'\{([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\}', re.MULTILINE), 'curly_bracket'),
+    # Parentheses: (placeholder)
+    (re.compile(r'\(([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\)', re.MULTILINE), 'parenthesis'),
+    # Double curly brackets: {{placeholder}}
+    (re.compile(r'\{\{([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\}\}', re.MULTILINE), 'double_curly_bracket'),
+    # Angle brackets: <placeholder>
+    (re.compile(r'<([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)>', re.MULTILINE), 'angle_bracket'),
+    # Underscores: __placeholder__ or _placeholder_
+    (re.compile(r'__([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)__', re.MULTILINE), 'double_underscore'),
+    (re.compile(r'_([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)_', re.MULTILINE), 'underscore'),
+]
+
+# Blank fields, matched one line at a time: a "Label:" line is a blank field when nothing follows
+# the colon ("Label: ") or what follows starts with underscores or a run of spaces ("Label: ____")
+_BLANK_FIELD_LINE_RE = re.compile(r'(\s*)([A-Z][a-zA-Z\s]*?):(.*)')
+_BLANK_FIELD_FILL_RE = re.compile(r'\s+(?:_{2,}|\s{2,})')
+
+# Detection results of recently seen texts (text -> placeholders), shared by all detectors so
+# re-processing an unchanged document skips the scan. Each caller gets its own list, but the
+# Placeholder objects in it are shared between callers; this relies on Placeholder being frozen
+DETECTION_CACHE_SIZE = 32
+_DETECTION_CACHE = OrderedDict()
+_DETECTION_CACHE_LOCK = threading.Lock()
+
+
 class PlaceholderDetector:
     def __init__(self):
-        """Initialize placeholder detector with regex patterns"""
-        # Define patterns for different placeholder formats
-        self.patterns = [
-            # Square brackets: [placeholder]
-            (r'\[([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\]', 'bracket'),
-            # Curly brackets: {placeholder}
-            (r'\{([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\}', 'curly_bracket'),
-            # Parentheses: (placeholder)
-            (r'\(([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\)', 'parenthesis'),
-            # Double curly brackets: {{placeholder}}
-            (r'\{\{([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)\}\}', 'double_curly_bracket'),
-            # Angle brackets: <placeholder>
-            (r'<([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)>', 'angle_bracket'),
-            # Underscores: __placeholder__ or _placeholder_
-            (r'__([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)__', 'double_underscore'),
-            (r'_([a-zA-Z0-9_\s,.\-/():\;&\'@#%+\?!=]+)_', 'underscore'),
-        ]
+        """Initialize placeholder detector with the precompiled regex patterns"""
+        self.patterns = _PATTERNS
     
     def detect_placeholders(self, text: str) -> List[Placeholder]:
         """
@@ -50,6 +85,16 @@ class PlaceholderDetector:
         Returns:
             List of Placeholder objects found
         """
+        # One scan settles text without any delimiter or colon (common for single paragraphs)
+        if not _ANY_REQUIRED_CHAR_RE.search(text):
+            return []
+        
+        with _DETECTION_CACHE_LOCK:
+            cached = _DETECTION_CACHE.get(text)
+            if cached is not None:
+                _DETECTION_CACHE.move_to_end(text)
+                return list(cached)
+        
         # Regex-based detection for explicit placeholders
         regex_placeholders = self._detect_with_regex(text)
         
@@ -59,17 +104,26 @@ class PlaceholderDetector:
         # Combine both
         all_placeholders = regex_placeholders + blank_field_placeholders
         
-        # Sort by position
-        all_placeholders.sort(key=lambda p: p.position)
+        # Sort by position (the lists are concatenations of per-pattern runs that are each in
+        # position order; list.sort merges such runs in linear time)
+        all_placeholders.sort(key=attrgetter('position'))
+        
+        with _DETECTION_CACHE_LOCK:
+            _DETECTION_CACHE[text] = tuple(all_placeholders)
+            if len(_DETECTION_CACHE) > DETECTION_CACHE_SIZE:
+                _DETECTION_CACHE.popitem(last=False)
         
         return all_placeholders
     
     def _detect_with_regex(self, text: str) -> List[Placeholder]:
         """Detect explicit placeholders using regex patterns"""
         placeholders = []
+        seen_spans = set()  # (position, end_position) of placeholders already added
         
         for pattern, format_type in self.patterns:
-            for match in re.finditer(pattern, text, re.MULTILINE):
+            if _REQUIRED_LITERALS[format_type] not in text:
+                continue
+            for match in pattern.finditer(text):
                 placeholder_text = match.group(0)
                 placeholder_name = match.group(1).strip()
                 start_pos = match.start()
@@ -85,7 +139,8 @@ class PlaceholderDetector:
                 )
                 
                 # Check for duplicates
-                if not self._duplicate_exists(placeholder, placeholders):
+                if (start_pos, end_pos) not in seen_spans:
+                    seen_spans.add((start_pos, end_pos))
                     placeholders.append(placeholder)
         
         return placeholders
@@ -97,76 +152,64 @@ class PlaceholderDetector:
         """
         placeholders = []
         
-        # Pattern 1: "Label: " (with colon and space, followed by empty or whitespace)
-        # This matches fields like "Name: ", "Address: ", "Email: "
-        pattern1 = r'^(\s*)([A-Z][a-zA-Z\s]*?):\s*$'
-        for match in re.finditer(pattern1, text, re.MULTILINE):
-            label_text = match.group(2).strip()
-            
-            # Skip very short labels that are likely not field names
-            if len(label_text) < 2:
+        # Every blank field has a colon after its label
+        if _REQUIRED_LITERALS['blank_field'] not in text:
+            return placeholders
+        
+        # Lines are split once and only lines with a colon are matched; a field never spans lines
+        line_end = -1
+        for line in text.split('\n'):
+            line_start = line_end + 1
+            line_end = line_start + len(line)
+            if ':' not in line:
                 continue
             
-            placeholder = Placeholder(
-                text=match.group(0),  # Full line including label and colon
-                name=label_text.lower().replace(' ', '_'),
-                format_type='blank_field',
-                position=match.start(),
-                end_position=match.end(),
-                detected_by='heuristic'
-            )
+            match = _BLANK_FIELD_LINE_RE.match(line)
+            if not match:
+                continue
             
-            if not self._duplicate_exists(placeholder, placeholders):
-                placeholders.append(placeholder)
-        
-        # Pattern 2: "Label: ____" (with underscores or spaces after colon)
-        pattern2 = r'^(\s*)([A-Z][a-zA-Z\s]*?):\s+(_{2,}|\s{2,}).*$'
-        for match in re.finditer(pattern2, text, re.MULTILINE):
             label_text = match.group(2).strip()
             
+            # Skip very short labels that are likely not field names
             if len(label_text) < 2:
                 continue
             
-            placeholder = Placeholder(
-                text=match.group(0),  # Full line
+            # "Label: " (empty or whitespace after the colon), e.g. "Name: ", "Address: ", "Email: ",
+            # or "Label: ____" (underscores or spaces after the colon)
+            after_colon = match.group(3)
+            if after_colon.strip() and not _BLANK_FIELD_FILL_RE.match(after_colon):
+                continue
+            
+            # The placeholder is the label and colon; the blank after it is found again when filling
+            label_start = match.start(2)
+            colon_end = match.end(2) + 1
+            placeholders.append(Placeholder(
+                text=line[label_start:colon_end],
                 name=label_text.lower().replace(' ', '_'),
                 format_type='blank_field',
-                position=match.start(),
-                end_position=match.end(),
+                position=line_start + label_start,
+                end_position=line_start + colon_end,
                 detected_by='heuristic'
-            )
-            
-            if not self._duplicate_exists(placeholder, placeholders):
-                placeholders.append(placeholder)
+            ))
         
         return placeholders
     
-    def _duplicate_exists(self, placeholder: Placeholder, existing: List[Placeholder]) -> bool:
-        """Check if a placeholder already exists in the list"""
-        for existing_p in existing:
-            if (existing_p.position == placeholder.position and 
-                existing_p.end_position == placeholder.end_position):
-                return True
-        return False
-    
     def extract_placeholder_names(self, text: str) -> List[str]:
         """Extract unique placeholder names"""
-        placeholders = self.detect_placeholders(text)
-        names = []
-        seen = set()
-        
-        for p in placeholders:
-            if p.name not in seen:
-                names.append(p.name)
-                seen.add(p.name)
-        
-        return names
+        return self.extract_names_from(self.detect_placeholders(text))
+    
+    def extract_names_from(self, placeholders: List[Placeholder]) -> List[str]:
+        """Unique names of already detected placeholders, in order of first appearance"""
+        return list(dict.fromkeys(p.name for p in placeholders))
+
+
+# Shared by detect_placeholders_simple (the detector holds no per-document state)
+_DEFAULT_DETECTOR = PlaceholderDetector()
 
 
 def detect_placeholders_simple(text: str) -> List[Dict]:
     """Convenience function for quick placeholder detection"""
-    detector = PlaceholderDetector()
-    placeholders = detector.detect_placeholders(text)
+    placeholders = _DEFAULT_DETECTOR.detect_placeholders(text)
     
     return [
         {